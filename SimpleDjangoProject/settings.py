@@ -26,9 +26,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.getenv('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'True') == 'True'
 
-ALLOWED_HOSTS = ["*"]
+ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '*').split(',')
 
 # Application definition
 
@@ -39,11 +39,13 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     'vehicle',
     'sorl.thumbnail'
 ]
 
 MIDDLEWARE = [
+    "vehicle.instrumentation.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -84,9 +86,93 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('POSTGRES_HOST'),
         'PORT': os.getenv('POSTGRES_PORT'),
+        # Keep connections open between requests instead of reconnecting every time;
+        # 0 restores per-request connections, 'None' keeps them forever. Under ASGI the
+        # async ORM runs queries in per-request threads, so persistent connections would
+        # pile up there: the default is 0 and pooling is left to pgbouncer
+        'CONN_MAX_AGE': None if os.getenv('DB_CONN_MAX_AGE') == 'None' else int(
+            os.getenv('DB_CONN_MAX_AGE', 0 if os.getenv('SERVER_MODE') == 'asgi' else 60)
+        ),
+        # Ping persistent connections before reuse so a restarted DB doesn't fail the request
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
     }
 }
 
+# DB_POOL_MODE=pgbouncer routes connections through a pgbouncer in transaction
+# pooling mode. Server-side cursors (QuerySet.iterator()) don't survive transaction
+# pooling, so they are disabled and iterator() falls back to client-side chunks.
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'direct')
+
+if DB_POOL_MODE == 'pgbouncer':
+    DATABASES['default'].update({
+        'HOST': os.getenv('PGBOUNCER_HOST', 'pgbouncer'),
+        'PORT': os.getenv('PGBOUNCER_PORT', '6432'),
+        'DISABLE_SERVER_SIDE_CURSORS': True,
+    })
+
+# Cache: in-process LRU (locmem) or Redis, selected by CACHE_BACKEND
+
+if os.getenv('CACHE_BACKEND', 'locmem') == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'vehicle',
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000))},
+        }
+    }
+
+# Rendered list pages (vehicle.page_cache): PAGE_CACHE_BACKEND is locmem (per process),
+# file (shared by workers on one host) or redis. Entries are keyed by a generation
+# counter kept in the default cache, so the default cache must be shared (redis)
+# when several workers run; VEHICLE_PAGE_CACHE_TIMEOUT=0 disables page caching
+
+PAGE_CACHE_BACKEND = os.getenv('PAGE_CACHE_BACKEND', 'locmem')
+
+if PAGE_CACHE_BACKEND == 'redis':
+    CACHES['pages'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+        'KEY_PREFIX': 'pages',
+    }
+elif PAGE_CACHE_BACKEND == 'file':
+    CACHES['pages'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('PAGE_CACHE_DIR', BASE_DIR / 'page_cache'),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('PAGE_CACHE_MAX_ENTRIES', 5000))},
+    }
+else:
+    CACHES['pages'] = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'vehicle-pages',
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('PAGE_CACHE_MAX_ENTRIES', 5000))},
+    }
+
+VEHICLE_PAGE_CACHE_TIMEOUT = int(os.getenv('VEHICLE_PAGE_CACHE_TIMEOUT', 300))
+
+# sorl.thumbnail keeps thumbnail metadata in the cache and falls back to the DB on a miss
+
+THUMBNAIL_KVSTORE = 'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore'
+
+# Thumbnail backend that reports {% thumbnail %} time to the request metrics
+
+THUMBNAIL_BACKEND = 'vehicle.instrumentation.TimedThumbnailBackend'
+
+# Timeout (seconds) for per-vehicle template fragments, keyed by updated_at
+
+VEHICLE_FRAGMENT_CACHE_TIMEOUT = int(os.getenv('VEHICLE_FRAGMENT_CACHE_TIMEOUT', 600))
+
+# Active vehicle types for VehicleForm (vehicle.choices) are cached under a version
+# counter in the default cache, bumped on every VehicleType change
+
+VEHICLE_TYPE_CHOICES_TIMEOUT = int(os.getenv('VEHICLE_TYPE_CHOICES_TIMEOUT', 3600))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -120,6 +206,17 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = "static/"
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Outside DEBUG static files get content-hashed names, so nginx can cache them forever
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage',
+    },
+}
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
@@ -128,3 +225,85 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Pagination mode for list views: 'offset' (page numbers) or 'cursor' (keyset)
+
+VEHICLE_PAGINATION_MODE = os.getenv('VEHICLE_PAGINATION_MODE', 'offset')
+
+# Serve vehicle list/detail and vehicle type list with async views (async ORM);
+# on by default when running under ASGI
+
+VEHICLE_ASYNC_VIEWS = os.getenv('VEHICLE_ASYNC_VIEWS', str(os.getenv('SERVER_MODE') == 'asgi')) == 'True'
+
+# Max concurrent DB sections of async views per worker process; keep
+# WEB_CONCURRENCY * this below Postgres (or pgbouncer) max connections
+
+VEHICLE_ASYNC_DB_CONCURRENCY = int(os.getenv('VEHICLE_ASYNC_DB_CONCURRENCY', 20))
+
+# Soft delete cascade for vehicle types: batch size and background processing.
+# Background jobs run in a thread of the web worker, and a worker recycled by gunicorn
+# (max_requests) abandons them, so `manage.py run_soft_delete_jobs` must run on a
+# schedule (e.g. cron every few minutes): it reclaims failed jobs and jobs whose
+# progress (updated_at) has not moved for SOFT_DELETE_STALE_AFTER seconds.
+
+SOFT_DELETE_BATCH_SIZE = int(os.getenv('SOFT_DELETE_BATCH_SIZE', 1000))
+SOFT_DELETE_IN_BACKGROUND = os.getenv('SOFT_DELETE_IN_BACKGROUND', 'False') == 'True'
+SOFT_DELETE_STALE_AFTER = int(os.getenv('SOFT_DELETE_STALE_AFTER', 300))
+
+# Bulk vehicle import: rows per bulk_create
+
+VEHICLE_IMPORT_BATCH_SIZE = int(os.getenv('VEHICLE_IMPORT_BATCH_SIZE', 1000))
+
+# Mileage telemetry (vehicle.history): readings per bulk_create and the token field
+# devices send in X-Telemetry-Token; an empty token disables /api/telemetry/
+
+VEHICLE_TELEMETRY_BATCH_SIZE = int(os.getenv('VEHICLE_TELEMETRY_BATCH_SIZE', 5000))
+VEHICLE_TELEMETRY_TOKEN = os.getenv('VEHICLE_TELEMETRY_TOKEN', '')
+
+# Admin changelists count rows exactly up to this limit and use the Postgres
+# planner estimate above it instead of a full COUNT(*)
+
+VEHICLE_ADMIN_EXACT_COUNT_LIMIT = int(os.getenv('VEHICLE_ADMIN_EXACT_COUNT_LIMIT', 10_000))
+
+# Thumbnail pre-generation for VehicleImage uploads (sizes used by templates)
+
+VEHICLE_THUMBNAIL_SIZES = [
+    ('300x200', {'crop': 'center'}),
+]
+VEHICLE_THUMBNAIL_PREGENERATE = os.getenv('VEHICLE_THUMBNAIL_PREGENERATE', 'True') == 'True'
+VEHICLE_THUMBNAIL_WORKERS = int(os.getenv('VEHICLE_THUMBNAIL_WORKERS', 4))
+
+# Vehicle photo uploads: files per request and parallel storage writers
+
+VEHICLE_MAX_IMAGES_PER_UPLOAD = int(os.getenv('VEHICLE_MAX_IMAGES_PER_UPLOAD', 20))
+VEHICLE_UPLOAD_WORKERS = int(os.getenv('VEHICLE_UPLOAD_WORKERS', 4))
+
+# Uploaded photos are stripped of EXIF, downsized to VEHICLE_IMAGE_MAX_SIZE px on the
+# longer side and re-encoded (webp, avif or progressive jpeg) under a content-hash name,
+# so the same photo is stored once (vehicle.images)
+
+VEHICLE_IMAGE_FORMAT = os.getenv('VEHICLE_IMAGE_FORMAT', 'webp')
+VEHICLE_IMAGE_MAX_SIZE = int(os.getenv('VEHICLE_IMAGE_MAX_SIZE', 2048))
+VEHICLE_IMAGE_QUALITY = int(os.getenv('VEHICLE_IMAGE_QUALITY', 82))
+
+# JSON API page size (?limit=) and its upper bound
+
+VEHICLE_API_PAGE_SIZE = int(os.getenv('VEHICLE_API_PAGE_SIZE', 20))
+VEHICLE_API_MAX_PAGE_SIZE = int(os.getenv('VEHICLE_API_MAX_PAGE_SIZE', 100))
+
+# Request instrumentation: Server-Timing header (total, sql, render, thumbnail),
+# Prometheus text metrics at /metrics/ (aggregated per worker process) and opt-in
+# cProfile sampling. A profile is also taken for requests with the header
+# X-Profile: <VEHICLE_PROFILE_TOKEN>
+# Metrics are served only to clients from VEHICLE_METRICS_ALLOWED_NETWORKS (the same
+# private ranges nginx allows) or with the header Authorization: Bearer <VEHICLE_METRICS_TOKEN>
+
+VEHICLE_SERVER_TIMING = os.getenv('VEHICLE_SERVER_TIMING', str(DEBUG)) == 'True'
+VEHICLE_METRICS_ENABLED = os.getenv('VEHICLE_METRICS_ENABLED', 'True') == 'True'
+VEHICLE_METRICS_TOKEN = os.getenv('VEHICLE_METRICS_TOKEN', '')
+VEHICLE_METRICS_ALLOWED_NETWORKS = os.getenv(
+    'VEHICLE_METRICS_ALLOWED_NETWORKS', '127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16'
+).split(',')
+VEHICLE_PROFILE_SAMPLE_RATE = float(os.getenv('VEHICLE_PROFILE_SAMPLE_RATE', 0))
+VEHICLE_PROFILE_TOKEN = os.getenv('VEHICLE_PROFILE_TOKEN', '')
+VEHICLE_PROFILE_DIR = os.getenv('VEHICLE_PROFILE_DIR', BASE_DIR / 'profiles')
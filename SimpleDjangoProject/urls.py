@@ -19,10 +19,12 @@ from django.contrib import admin
 from django.urls import path, include
 
 from SimpleDjangoProject import settings
+from vehicle.instrumentation import metrics_view
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path('vehicle/', include('vehicle.urls', namespace='vehicle')),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
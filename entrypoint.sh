@@ -0,0 +1,11 @@
+#!/bin/sh
+set -e
+
+python manage.py migrate --noinput
+python manage.py collectstatic --noinput
+
+if [ "$SERVER_MODE" = "dev" ]; then
+    exec python manage.py runserver 0.0.0.0:8000
+fi
+
+exec gunicorn -c gunicorn.conf.py
@@ -0,0 +1,26 @@
+"""
+Gunicorn settings for the production profile, driven by environment variables.
+
+SERVER_MODE=wsgi runs SimpleDjangoProject.wsgi with sync/threaded workers,
+SERVER_MODE=asgi runs SimpleDjangoProject.asgi under uvicorn workers.
+"""
+import multiprocessing
+import os
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-') or None
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'SimpleDjangoProject.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'SimpleDjangoProject.wsgi:application'
+    worker_class = 'gthread' if threads > 1 else 'sync'
@@ -1,6 +1,121 @@
-from django.contrib import admin
-from .models import VehicleType, Vehicle, VehicleImage
+from django.contrib import admin, messages
+from django.db import transaction
+from django.utils import timezone
 
-admin.site.register(VehicleType)
-admin.site.register(Vehicle)
-admin.site.register(VehicleImage)
+from . import page_cache
+from .choices import invalidate_vehicle_type_choices
+from .models import Attribute, SparePart, SparePartType, VehicleType, Vehicle, VehicleImage
+from .pagination import EstimatedCountPaginator
+from .services import soft_delete_spare_part_type, soft_delete_vehicle_type
+
+
+class SoftDeleteAdmin(admin.ModelAdmin):
+    """
+    Базовая админка моделей с мягким удалением. Список не считает строки полным
+    COUNT(*): общий итог отключён, а число результатов оценивает
+    EstimatedCountPaginator. Массовые действия помечают записи одним update()
+    вместо штатного удаления по одной строке.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-id',)
+    actions = ('soft_delete_selected', 'restore_selected')
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Штатное действие удаляет строки физически и шлёт сигналы для каждой
+        actions.pop('delete_selected', None)
+        return actions
+
+    def mark_deleted(self, queryset, is_deleted):
+        with transaction.atomic():
+            count = queryset.update(is_deleted=is_deleted, updated_at=timezone.now())
+            # update() идёт мимо сигналов
+            page_cache.invalidate()
+        return count
+
+    @admin.action(description='Пометить удалёнными')
+    def soft_delete_selected(self, request, queryset):
+        count = self.mark_deleted(queryset.filter(is_deleted=False), True)
+        self.message_user(request, f'Помечено удалёнными: {count}', messages.SUCCESS)
+
+    @admin.action(description='Восстановить')
+    def restore_selected(self, request, queryset):
+        count = self.mark_deleted(queryset.filter(is_deleted=True), False)
+        self.message_user(request, f'Восстановлено: {count}', messages.SUCCESS)
+
+
+@admin.register(VehicleType)
+class VehicleTypeAdmin(SoftDeleteAdmin):
+    list_display = ('id', 'name', 'is_deleted', 'created_at')
+    list_filter = ('is_deleted',)
+    search_fields = ('name',)
+
+    def mark_deleted(self, queryset, is_deleted):
+        count = super().mark_deleted(queryset, is_deleted)
+        invalidate_vehicle_type_choices()
+        return count
+
+    @admin.action(description='Пометить удалёнными')
+    def soft_delete_selected(self, request, queryset):
+        # Технику типа удаляет каскад пачками, как и при удалении из интерфейса
+        vehicle_types = list(queryset.filter(is_deleted=False))
+        for vehicle_type in vehicle_types:
+            soft_delete_vehicle_type(vehicle_type)
+        self.message_user(request, f'Помечено удалёнными: {len(vehicle_types)}', messages.SUCCESS)
+
+
+@admin.register(Vehicle)
+class VehicleAdmin(SoftDeleteAdmin):
+    list_display = ('id', 'reg_number', 'brand', 'type', 'operation_status', 'mileage', 'is_deleted', 'updated_at')
+    list_select_related = ('type',)
+    # Фильтры идут по индексам vehicle_status_id_idx, vehicle_alive_type_idx
+    # и частичным индексам по is_deleted
+    list_filter = ('operation_status', 'is_deleted', 'type')
+    search_fields = ('reg_number', 'brand')
+    autocomplete_fields = ('type',)
+
+    def mark_deleted(self, queryset, is_deleted):
+        with transaction.atomic():
+            if is_deleted:
+                VehicleImage.alive.filter(vehicle__in=queryset).update(is_deleted=True, updated_at=timezone.now())
+            return super().mark_deleted(queryset, is_deleted)
+
+
+@admin.register(VehicleImage)
+class VehicleImageAdmin(SoftDeleteAdmin):
+    list_display = ('id', 'vehicle', 'file', 'is_deleted', 'created_at')
+    list_select_related = ('vehicle',)
+    list_filter = ('is_deleted',)
+    raw_id_fields = ('vehicle',)
+
+
+@admin.register(SparePartType)
+class SparePartTypeAdmin(SoftDeleteAdmin):
+    list_display = ('id', 'name', 'is_deleted', 'created_at')
+    list_filter = ('is_deleted',)
+    search_fields = ('name',)
+
+    @admin.action(description='Пометить удалёнными')
+    def soft_delete_selected(self, request, queryset):
+        # Запчасти типа помечаются вместе с ним, как и при удалении из интерфейса
+        part_types = list(queryset.filter(is_deleted=False))
+        for part_type in part_types:
+            soft_delete_spare_part_type(part_type)
+        self.message_user(request, f'Помечено удалёнными: {len(part_types)}', messages.SUCCESS)
+
+
+@admin.register(SparePart)
+class SparePartAdmin(SoftDeleteAdmin):
+    list_display = ('id', 'type', 'vehicle', 'status', 'is_deleted', 'created_at')
+    list_select_related = ('type', 'vehicle')
+    list_filter = ('status', 'is_deleted', 'type')
+    autocomplete_fields = ('type',)
+    raw_id_fields = ('vehicle',)
+
+
+@admin.register(Attribute)
+class AttributeAdmin(SoftDeleteAdmin):
+    list_display = ('id', 'name', 'unit', 'data_type', 'is_deleted')
+    list_filter = ('data_type', 'is_deleted')
+    search_fields = ('name',)
@@ -0,0 +1,223 @@
+import codecs
+import hashlib
+
+from django.conf import settings
+from django.db import NotSupportedError
+from django.db.models import F, Max
+from django.http import Http404, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.generic import View
+
+from . import page_cache
+from .aggregates import fleet_status
+from .forms import PeriodForm, VehicleFilterForm
+from .history import TelemetryIngest, fleet_downtime, vehicle_downtime
+from .models import FleetCounter, Vehicle, VehicleImage, VehicleType
+from .pagination import CursorPaginator
+from .search import SearchMode, search_vehicles
+from .transfer import iter_rows
+
+VEHICLE_FIELDS = (
+    'id', 'reg_number', 'brand', 'date_purchase', 'type_id', 'mileage',
+    'operation_status', 'created_at', 'updated_at',
+)
+VEHICLE_TYPE_FIELDS = ('id', 'name', 'created_at', 'updated_at')
+VEHICLE_IMAGE_FIELDS = ('id', 'vehicle_id', 'file', 'created_at', 'updated_at')
+
+
+def max_updated_at(*querysets):
+    values = [qs.aggregate(value=Max('updated_at'))['value'] for qs in querysets]
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def image_url(row):
+    file_field = VehicleImage._meta.get_field('file')
+    row['url'] = file_field.storage.url(row['file']) if row['file'] else None
+    return row
+
+
+class ConditionalJsonView(View):
+    """
+    JSON-ответ с ETag и Last-Modified по max(updated_at). Если данные не менялись,
+    возвращается 304 до выборки строк и сериализации.
+
+    Мягкое удаление тоже обновляет updated_at, поэтому версия считается по всей
+    таблице, а не только по живым строкам. Жёсткое удаление и транзакция, которая
+    зафиксировалась позже более новой, max(updated_at) не меняют, поэтому в ETag
+    входит и поколение кэша страниц: его увеличивает каждая запись и каждый COMMIT.
+    По той же причине 304 отдаётся только по If-None-Match, If-Modified-Since
+    не проверяется.
+    """
+
+    def get_last_modified(self):
+        raise NotImplementedError
+
+    def get_data(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        last_modified = self.get_last_modified()
+        etag = None
+        if last_modified is not None:
+            key = f'{request.get_full_path()}|{last_modified.isoformat()}|{page_cache.get_generation()}'
+            etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+            response = get_conditional_response(request, etag=etag)
+            if response is not None:
+                return response
+
+        response = JsonResponse(self.get_data())
+        if etag is not None:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.GET.get('limit', settings.VEHICLE_API_PAGE_SIZE))
+        except ValueError:
+            limit = settings.VEHICLE_API_PAGE_SIZE
+        return max(1, min(limit, settings.VEHICLE_API_MAX_PAGE_SIZE))
+
+    def paginate(self, queryset):
+        page = CursorPaginator(queryset, self.get_limit()).page(self.request.GET.get('cursor'))
+        return {
+            'results': page.object_list,
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        }
+
+
+class VehicleApiListView(ConditionalJsonView):
+    def get_last_modified(self):
+        return max_updated_at(Vehicle.objects.all(), VehicleType.objects.all())
+
+    def get(self, request, *args, **kwargs):
+        filter_form = VehicleFilterForm(request.GET or None)
+        # API листается только курсором по (created_at, id), который сбросил бы
+        # ранжирование по сходству
+        if filter_form.is_valid() and filter_form.is_ranked():
+            return JsonResponse(
+                {'errors': {'search': ['Режим similar не поддерживается курсорной пагинацией API']}}, status=400
+            )
+        return super().get(request, *args, **kwargs)
+
+    def get_data(self):
+        qs = Vehicle.alive.all()
+        filter_form = VehicleFilterForm(self.request.GET or None)
+        if filter_form.is_valid():
+            qs = search_vehicles(
+                qs,
+                filter_form.cleaned_data['brand'],
+                filter_form.cleaned_data['search'] or SearchMode.BRAND
+            )
+        return self.paginate(qs.values(*VEHICLE_FIELDS, type_name=F('type__name')))
+
+
+class VehicleApiDetailView(ConditionalJsonView):
+    def get_last_modified(self):
+        row = Vehicle.objects.filter(pk=self.kwargs['pk']).values_list(
+            'updated_at', 'type__updated_at'
+        ).first()
+        if row is None:
+            raise Http404('Техника не найдена')
+        return max(row)
+
+    def get_data(self):
+        vehicle = Vehicle.objects.filter(pk=self.kwargs['pk']).values(
+            *VEHICLE_FIELDS, 'is_deleted', type_name=F('type__name')
+        ).get()
+        vehicle['images'] = [
+            image_url(row)
+            for row in VehicleImage.alive.filter(vehicle_id=vehicle['id']).order_by('id').values(
+                *VEHICLE_IMAGE_FIELDS
+            )
+        ]
+        return vehicle
+
+
+class VehicleTypeApiListView(ConditionalJsonView):
+    def get_last_modified(self):
+        return max_updated_at(VehicleType.objects.all())
+
+    def get_data(self):
+        return self.paginate(VehicleType.alive.values(*VEHICLE_TYPE_FIELDS))
+
+
+class VehicleImageApiListView(ConditionalJsonView):
+    def get_last_modified(self):
+        return max_updated_at(VehicleImage.objects.all())
+
+    def get_data(self):
+        qs = VehicleImage.alive.all()
+        vehicle_id = self.request.GET.get('vehicle')
+        if vehicle_id:
+            if not vehicle_id.isdigit():
+                raise Http404('Некорректный идентификатор техники')
+            qs = qs.filter(vehicle_id=vehicle_id)
+        data = self.paginate(qs.values(*VEHICLE_IMAGE_FIELDS))
+        data['results'] = [image_url(row) for row in data['results']]
+        return data
+
+
+class FleetStatusApiView(ConditionalJsonView):
+    def get_last_modified(self):
+        return max_updated_at(FleetCounter.objects.all(), VehicleType.objects.all())
+
+    def get_data(self):
+        return fleet_status()
+
+
+class PeriodReportView(View):
+    """Отчёт за период ?start=YYYY-MM-DD&end=YYYY-MM-DD (по умолчанию последний год)."""
+
+    def get(self, request, *args, **kwargs):
+        form = PeriodForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        try:
+            return JsonResponse(self.get_data(*form.period()))
+        except NotSupportedError as exc:
+            return JsonResponse({'errors': [str(exc)]}, status=501)
+
+    def get_data(self, start, end):
+        raise NotImplementedError
+
+
+class VehicleHistoryApiView(PeriodReportView):
+    def get_data(self, start, end):
+        if not Vehicle.objects.filter(pk=self.kwargs['pk']).exists():
+            raise Http404('Техника не найдена')
+        return vehicle_downtime(self.kwargs['pk'], start, end)
+
+
+class FleetDowntimeApiView(PeriodReportView):
+    def get_data(self, start, end):
+        return fleet_downtime(start, end)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class TelemetryApiView(View):
+    """
+    Приём показаний пробега: тело запроса в JSONL (или CSV при Content-Type text/csv)
+    со строками vehicle, recorded_at, mileage. Доступ по заголовку X-Telemetry-Token;
+    без VEHICLE_TELEMETRY_TOKEN приём выключен.
+    """
+
+    def post(self, request):
+        token = settings.VEHICLE_TELEMETRY_TOKEN
+        if not token or not constant_time_compare(request.headers.get('X-Telemetry-Token', ''), token):
+            return JsonResponse({'errors': ['Неверный токен телеметрии']}, status=403)
+        fmt = 'csv' if request.content_type == 'text/csv' else 'jsonl'
+        # Тело читается потоком, а не через request.body с его лимитом размера
+        stream = codecs.getreader('utf-8-sig')(request)
+        ingest = TelemetryIngest()
+        try:
+            ingest.run(iter_rows(stream, fmt))
+        except (ValueError, UnicodeDecodeError) as exc:
+            return JsonResponse({'created': ingest.created, 'errors': [str(exc)]}, status=400)
+        return JsonResponse(ingest.report())
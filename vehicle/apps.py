@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class VehicleConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "vehicle"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .instrumentation import install_sql_timer
+
+        connection_created.connect(install_sql_timer)
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from . import page_cache
+from .models import VehicleType
+
+VERSION_KEY = 'vehicle:type-choices-version'
+
+_memo = (None, None)
+
+
+def vehicle_type_choices():
+    """
+    Активные типы техники [(id, name)] для выбора в VehicleForm. Список хранится
+    в кэше под текущей версией и в памяти процесса, поэтому отрисовка и проверка
+    формы стоят одно чтение счётчика версии вместо запроса к БД.
+    """
+    global _memo
+    version = page_cache.get_generation(VERSION_KEY)
+    memo_version, choices = _memo
+    if memo_version != version:
+        key = f'vehicle:type-choices:{version}'
+        choices = cache.get(key)
+        if choices is None:
+            choices = list(VehicleType.alive.order_by('id').values_list('id', 'name'))
+            cache.set(key, choices, settings.VEHICLE_TYPE_CHOICES_TIMEOUT)
+        _memo = (version, choices)
+    return choices
+
+
+def invalidate_vehicle_type_choices():
+    page_cache.invalidate(VERSION_KEY)
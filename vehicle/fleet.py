@@ -0,0 +1,123 @@
+import io
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from PIL import Image
+
+from . import page_cache
+from .choices import invalidate_vehicle_type_choices
+from .models import Vehicle, VehicleImage, VehicleStatus, VehicleType
+
+BRANDS = [
+    ('КАМАЗ', 30), ('УРАЛ', 14), ('МАЗ', 12), ('ГАЗ', 12), ('ЗИЛ', 4),
+    ('Volvo', 8), ('Scania', 7), ('MAN', 6), ('Mercedes-Benz', 5), ('Shacman', 2),
+]
+TYPE_NAMES = [
+    'Самосвал', 'Тягач', 'Бортовой', 'Автокран', 'Цистерна',
+    'Фургон', 'Экскаватор', 'Погрузчик', 'Бульдозер', 'Автобус',
+]
+STATUSES = [(VehicleStatus.IN_OPERATION, 70), (VehicleStatus.IDLE, 20), (VehicleStatus.REPAIR, 10)]
+REG_LETTERS = 'АВЕКМНОРСТУХ'
+REGIONS = ['77', '97', '99', '177', '50', '78', '66', '16', '02', '54']
+
+
+def weighted(rng, pairs, k):
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights, k=k)
+
+
+class FleetGenerator:
+    """
+    Синтетический парк с воспроизводимым (по seed) распределением: типы по закону Ципфа,
+    популярные бренды, логнормальный пробег, свежие покупки чаще старых, часть записей
+    мягко удалена. Фото ссылаются на небольшой пул реальных JPEG (photos) или пустые.
+    """
+
+    def __init__(self, seed=0, batch_size=5000, deleted_ratio=0.03, photos=0):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.batch_size = batch_size
+        self.deleted_ratio = deleted_ratio
+        self.photos = photos
+        self.types = []
+        self.vehicles = 0
+        self.images = 0
+
+    def run(self, types, vehicles, images, type_names=None):
+        self.types = self.create_types(types, type_names)
+        vehicle_ids = self.create_vehicles(vehicles)
+        self.create_images(vehicle_ids, images)
+        # bulk_create идёт мимо сигналов
+        page_cache.invalidate()
+        return self
+
+    def create_types(self, count, names=None):
+        names = names or [
+            TYPE_NAMES[i % len(TYPE_NAMES)] + (f' {i // len(TYPE_NAMES) + 1}' if i >= len(TYPE_NAMES) else '')
+            for i in range(count)
+        ]
+        types = VehicleType.objects.bulk_create([VehicleType(name=name) for name in names[:count]])
+        # bulk_create идёт мимо сигналов
+        invalidate_vehicle_type_choices()
+        return types
+
+    def create_vehicles(self, count):
+        rng = self.rng
+        type_weights = [(vehicle_type.pk, 1 / rank) for rank, vehicle_type in enumerate(self.types, start=1)]
+        today = date.today()
+        ids = []
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            type_ids = weighted(rng, type_weights, size)
+            brands = weighted(rng, BRANDS, size)
+            statuses = weighted(rng, STATUSES, size)
+            batch = [
+                Vehicle(
+                    reg_number=self.reg_number(start + i),
+                    brand=brands[i],
+                    date_purchase=today - timedelta(days=int(rng.triangular(0, 15 * 365, 0))),
+                    type_id=type_ids[i],
+                    mileage=Decimal(f'{min(rng.lognormvariate(11, 0.8), 9_999_999):.2f}'),
+                    operation_status=statuses[i],
+                    is_deleted=rng.random() < self.deleted_ratio,
+                )
+                for i in range(size)
+            ]
+            ids += [vehicle.pk for vehicle in Vehicle.objects.bulk_create(batch)]
+        self.vehicles += count
+        return ids
+
+    def create_images(self, vehicle_ids, count):
+        if not vehicle_ids or not count:
+            return
+        files = self.photo_pool() or ['']
+        for start in range(0, count, self.batch_size):
+            size = min(self.batch_size, count - start)
+            VehicleImage.objects.bulk_create([
+                VehicleImage(
+                    vehicle_id=vehicle_id,
+                    file=self.rng.choice(files),
+                    is_deleted=self.rng.random() < self.deleted_ratio,
+                )
+                for vehicle_id in self.rng.choices(vehicle_ids, k=size)
+            ])
+        self.images += count
+
+    def photo_pool(self):
+        storage = VehicleImage._meta.get_field('file').storage
+        names = []
+        for i in range(self.photos):
+            buffer = io.BytesIO()
+            width = self.rng.choice([800, 1280, 1600])
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            Image.new('RGB', (width, width * 3 // 4), color).save(buffer, 'JPEG', quality=85)
+            names.append(storage.save(f'vehicle_images/fleet_{self.seed}_{i}.jpg', ContentFile(buffer.getvalue())))
+        return names
+
+    def reg_number(self, index):
+        # Уникальный номер вида А123ВС77 для каждого индекса
+        number, letters = index % 999 + 1, index // 999
+        chars = ''.join(REG_LETTERS[letters // len(REG_LETTERS) ** p % len(REG_LETTERS)] for p in range(3))
+        return f'{chars[0]}{number:03d}{chars[1:]}{REGIONS[index % len(REGIONS)]}'
@@ -1,9 +1,57 @@
+from datetime import datetime, time, timedelta
+from functools import partial
+
 from django import forms
+from django.conf import settings
+from django.forms import inlineformset_factory
+from django.utils import timezone
+from PIL import Image
 
+from .choices import vehicle_type_choices
+from .models import Attribute, AttributeDataType, SparePart, SparePartType
 from .models import Vehicle, VehicleImage, VehicleType
+from .search import SearchMode
+
+
+def bootstrap_widgets(form_class):
+    """
+    Проставляет CSS-классы виджетам один раз для класса формы: экземпляры получают
+    их вместе с копией base_fields, без обхода полей в каждом __init__.
+    """
+    for field in form_class.base_fields.values():
+        widget = field.widget
+        widget.attrs['class'] = 'form-select' if isinstance(widget, forms.Select) else 'form-control'
+    return form_class
+
+
+class VehicleTypeChoiceField(forms.TypedChoiceField):
+    """
+    Выбор активного типа техники по кэшированному списку vehicle_type_choices:
+    ни отрисовка, ни проверка значения не обращаются к БД.
+    """
 
+    def __init__(self, **kwargs):
+        super().__init__(choices=self.get_choices, coerce=self.to_vehicle_type, **kwargs)
 
+    @staticmethod
+    def get_choices():
+        return [('', '---------'), *vehicle_type_choices()]
+
+    @staticmethod
+    def to_vehicle_type(value):
+        pk = int(value)
+        # Тип могли удалить между проверкой значения и приведением: ValueError
+        # TypedChoiceField превращает в ошибку формы invalid_choice
+        name = dict(vehicle_type_choices()).get(pk)
+        if name is None:
+            raise ValueError(pk)
+        return VehicleType(pk=pk, name=name)
+
+
+@bootstrap_widgets
 class VehicleForm(forms.ModelForm):
+    type = VehicleTypeChoiceField(label='Тип техники')
+
     class Meta:
         model = Vehicle
         fields = [
@@ -17,15 +65,54 @@ class VehicleForm(forms.ModelForm):
             'mileage': forms.NumberInput(attrs={'placeholder': '0'}),
         }
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields['type'].queryset = VehicleType.objects.filter(is_deleted=False)
-        for field in self.fields.values():
-            widget = field.widget
-            if isinstance(widget, forms.Select):
-                widget.attrs['class'] = 'form-select'
-            else:
-                widget.attrs['class'] = 'form-control'
+    def _get_validation_exclusions(self):
+        # Тип уже сверен со списком активных типов; проверка ForeignKey в full_clean
+        # повторила бы её отдельным запросом
+        exclude = super()._get_validation_exclusions()
+        exclude.add('type')
+        return exclude
+
+
+class VehicleImportForm(VehicleForm):
+    """Проверка строк импорта: тип техники разрешается импортёром по названию."""
+
+    type = None
+
+    class Meta(VehicleForm.Meta):
+        fields = [name for name in VehicleForm.Meta.fields if name != 'type']
+
+
+class TelemetryReadingForm(forms.Form):
+    """Строка телеметрии: ID техники, время показания и пробег."""
+    vehicle = forms.IntegerField(min_value=1)
+    recorded_at = forms.DateTimeField()
+    mileage = forms.DecimalField(max_digits=10, decimal_places=2, min_value=0)
+
+
+class PeriodForm(forms.Form):
+    """Период отчёта [start, end); по умолчанию последние 365 дней."""
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+
+    def period(self):
+        end = self.cleaned_data.get('end') or timezone.localdate() + timedelta(days=1)
+        start = self.cleaned_data.get('start') or end - timedelta(days=365)
+        return (
+            timezone.make_aware(datetime.combine(start, time.min)),
+            timezone.make_aware(datetime.combine(end, time.min)),
+        )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('start') and cleaned_data.get('end') and cleaned_data['start'] >= cleaned_data['end']:
+            raise forms.ValidationError('Начало периода должно быть раньше конца.')
+        return cleaned_data
+
+
+class VehicleImportUploadForm(forms.Form):
+    file = forms.FileField(label='Файл CSV или JSONL')
+    format = forms.ChoiceField(label='Формат', choices=[('csv', 'CSV'), ('jsonl', 'JSONL')], required=False)
+    create_types = forms.BooleanField(label='Создавать новые типы', required=False)
 
 
 class VehicleImageForm(forms.ModelForm):
@@ -38,6 +125,56 @@ class VehicleImageForm(forms.ModelForm):
         self.fields['file'].required = False
 
 
+# Класс формсета строится один раз при импорте, а не на каждый запрос
+VehicleImageFormSet = inlineformset_factory(
+    Vehicle, VehicleImage,
+    form=VehicleImageForm,
+    extra=0,
+    can_delete=True
+)
+
+
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class MultipleImageField(forms.ImageField):
+    """Проверяет каждый файл через Pillow так же, как одиночный ImageField."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultipleFileInput(attrs={'class': 'form-control', 'accept': 'image/*'}))
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, data):
+        upload = super().to_python(data)
+        # Больше 2 × MAX_IMAGE_PIXELS Pillow отвергает сам (DecompressionBombError), а до
+        # этого лишь предупреждает, и нормализация декодировала бы такое фото целиком
+        limit = Image.MAX_IMAGE_PIXELS
+        if upload is not None and limit and upload.image.width * upload.image.height > limit:
+            raise forms.ValidationError('Слишком большое изображение.', code='invalid_image')
+        return upload
+
+    def clean(self, data, initial=None):
+        if not data:
+            return super().clean(None, initial) or []
+        if not isinstance(data, (list, tuple)):
+            data = [data]
+        single_file_clean = super().clean
+        return [single_file_clean(item, initial) for item in data]
+
+
+class VehicleImageUploadForm(forms.Form):
+    images = MultipleImageField(label='Фотографии', required=False)
+
+    def clean_images(self):
+        images = self.cleaned_data['images']
+        limit = settings.VEHICLE_MAX_IMAGES_PER_UPLOAD
+        if len(images) > limit:
+            raise forms.ValidationError(f'Можно загрузить не больше {limit} фото за раз.')
+        return images
+
+
+@bootstrap_widgets
 class VehicleTypeForm(forms.ModelForm):
     class Meta:
         model = VehicleType
@@ -46,12 +183,122 @@ class VehicleTypeForm(forms.ModelForm):
             'name': forms.TextInput(attrs={'placeholder': 'Трактор'})
         }
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        for field in self.fields.values():
-            widget = field.widget
-            widget.attrs['class'] = 'form-control'
-
 
 class VehicleFilterForm(forms.Form):
     brand = forms.CharField(label='Бренд', required=False)
+    search = forms.ChoiceField(
+        label='Режим поиска',
+        choices=SearchMode.choices,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def is_ranked(self):
+        """Результаты упорядочены по сходству, а не по (created_at, id)."""
+        return bool(self.cleaned_data['brand'].strip()) and self.cleaned_data['search'] == SearchMode.SIMILAR
+
+
+@bootstrap_widgets
+class SparePartTypeForm(forms.ModelForm):
+    class Meta:
+        model = SparePartType
+        fields = ['name']
+        widgets = {
+            'name': forms.TextInput(attrs={'placeholder': 'Фильтр'})
+        }
+
+
+@bootstrap_widgets
+class AttributeForm(forms.ModelForm):
+    class Meta:
+        model = Attribute
+        fields = ['name', 'unit', 'data_type']
+        widgets = {
+            'name': forms.TextInput(attrs={'placeholder': 'Диаметр'}),
+            'unit': forms.TextInput(attrs={'placeholder': 'мм, кг'}),
+        }
+
+    def clean_data_type(self):
+        data_type = self.cleaned_data['data_type']
+        if self.instance.pk and data_type != self.instance.data_type and self.instance.values.exists():
+            raise forms.ValidationError('Нельзя сменить тип данных атрибута, у которого уже есть значения.')
+        return data_type
+
+
+ATTRIBUTE_FORM_FIELDS = {
+    AttributeDataType.STRING: partial(forms.CharField, max_length=255),
+    AttributeDataType.INTEGER: forms.IntegerField,
+    AttributeDataType.DECIMAL: partial(forms.DecimalField, max_digits=18, decimal_places=4),
+    AttributeDataType.FLOAT: forms.FloatField,
+}
+
+
+def attribute_form_field(attribute, **kwargs):
+    """Поле формы, приводящее ввод к типу данных атрибута."""
+    field = ATTRIBUTE_FORM_FIELDS[attribute.data_type](label=attribute.label, **kwargs)
+    field.widget.attrs['class'] = 'form-control'
+    return field
+
+
+@bootstrap_widgets
+class SparePartForm(forms.ModelForm):
+    type = forms.ModelChoiceField(queryset=SparePartType.alive.all(), label='Тип запчасти')
+    # Номер вместо списка: в парке десятки тысяч единиц техники
+    vehicle = forms.ModelChoiceField(
+        queryset=Vehicle.alive.all(),
+        required=False,
+        label='Закрепить за техникой',
+        widget=forms.NumberInput(attrs={'placeholder': 'ID техники'})
+    )
+
+    class Meta:
+        model = SparePart
+        fields = ['type', 'vehicle', 'status']
+
+    def __init__(self, *args, attributes=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.attributes = list(attributes)
+        current = {item.attribute_id: item.value for item in getattr(self.instance, 'attribute_list', [])}
+        for attribute in self.attributes:
+            name = f'attribute_{attribute.pk}'
+            self.fields[name] = attribute_form_field(attribute, required=False)
+            self.initial.setdefault(name, current.get(attribute.pk))
+
+    def attribute_fields(self):
+        return [self[f'attribute_{attribute.pk}'] for attribute in self.attributes]
+
+    def attribute_values(self):
+        return {attribute: self.cleaned_data[f'attribute_{attribute.pk}'] for attribute in self.attributes}
+
+
+@bootstrap_widgets
+class SparePartFilterForm(forms.Form):
+    LOOKUPS = [('exact', '='), ('gt', '>'), ('gte', '≥'), ('lt', '<'), ('lte', '≤')]
+
+    type = forms.ModelChoiceField(
+        queryset=SparePartType.alive.order_by('name'), required=False, label='Тип', empty_label='Все типы'
+    )
+    attribute = forms.ModelChoiceField(
+        queryset=Attribute.alive.order_by('name'), required=False, label='Атрибут', empty_label='Атрибут'
+    )
+    lookup = forms.ChoiceField(choices=LOOKUPS, required=False, label='Условие')
+    value = forms.CharField(required=False, label='Значение')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        attribute, value = cleaned_data.get('attribute'), cleaned_data.get('value')
+        if attribute and value:
+            try:
+                cleaned_data['value'] = attribute_form_field(attribute).clean(value)
+            except forms.ValidationError as exc:
+                self.add_error('value', exc)
+        return cleaned_data
+
+    def filter(self, queryset):
+        if self.cleaned_data['type']:
+            queryset = queryset.filter(type=self.cleaned_data['type'])
+        if self.cleaned_data['attribute'] and self.cleaned_data['value'] not in (None, ''):
+            queryset = queryset.filter_attribute(
+                self.cleaned_data['attribute'], self.cleaned_data['lookup'] or 'exact', self.cleaned_data['value']
+            )
+        return queryset
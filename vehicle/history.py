@@ -0,0 +1,199 @@
+from django.conf import settings
+from django.db import NotSupportedError, connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from . import page_cache
+from .forms import TelemetryReadingForm
+from .models import Vehicle, VehicleHistory, VehicleStatus
+
+DOWNTIME_STATUSES = [VehicleStatus.IDLE, VehicleStatus.REPAIR]
+
+UPDATE_MILEAGE_SQL = '''
+UPDATE vehicle_vehicle AS v
+SET mileage = r.mileage, updated_at = %s
+FROM unnest(%s::bigint[], %s::numeric[]) AS r(id, mileage)
+WHERE v.id = r.id AND v.mileage < r.mileage
+'''
+
+# Статус на начало периода берётся из последней смены до него, дальше каждая смена
+# длится до следующей (или до конца периода). Обе выборки идут по частичному индексу
+# vehiclehistory_status_idx, строки телеметрии без статуса в него не попадают.
+DOWNTIME_SQL = '''
+WITH changes AS (
+    SELECT vehicle_id, operation_status, recorded_at
+    FROM vehicle_vehiclehistory
+    WHERE operation_status IS NOT NULL AND recorded_at >= %(start)s AND recorded_at < %(end)s {vehicle}
+    UNION ALL
+    SELECT * FROM (
+        SELECT DISTINCT ON (vehicle_id) vehicle_id, operation_status, %(start)s::timestamptz
+        FROM vehicle_vehiclehistory
+        WHERE operation_status IS NOT NULL AND recorded_at < %(start)s {vehicle}
+        ORDER BY vehicle_id, recorded_at DESC
+    ) AS initial
+),
+intervals AS (
+    SELECT vehicle_id, operation_status,
+           LEAD(recorded_at, 1, %(end)s) OVER (PARTITION BY vehicle_id ORDER BY recorded_at) - recorded_at AS duration
+    FROM changes
+)
+SELECT {group}, i.operation_status, EXTRACT(EPOCH FROM SUM(i.duration)), COUNT(DISTINCT i.vehicle_id)
+FROM intervals i
+{join}
+WHERE i.operation_status = ANY(%(statuses)s)
+GROUP BY {group}, i.operation_status
+ORDER BY {group}, i.operation_status
+'''
+
+
+def journal_available():
+    """
+    Журнал правок ведут триггеры PostgreSQL (миграция 0010), и отчёты читают его
+    SQL с DISTINCT ON и интервалами; на остальных бэкендах (SQLite в тестах) их нет.
+    """
+    return connection.vendor == 'postgresql'
+
+
+class TelemetryIngest:
+    """
+    Приём показаний пробега с объектов. Строки проверяются TelemetryReadingForm,
+    дописываются в VehicleHistory через bulk_create пачками по batch_size, а пробег
+    техники поднимается до последнего показания пачки одним UPDATE. Существование
+    техники проверяется одним запросом на пачку только по её id.
+    """
+
+    def __init__(self, batch_size=None, max_errors=100):
+        self.batch_size = batch_size or settings.VEHICLE_TELEMETRY_BATCH_SIZE
+        self.max_errors = max_errors
+        self.created = 0
+        self.errors = []
+
+    def run(self, rows):
+        batch = []
+        for line, row in enumerate(rows, start=1):
+            reading = self.build(line, row)
+            if reading is None:
+                continue
+            batch.append((line, reading))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        self.flush(batch)
+        self.errors.sort(key=lambda error: error['line'])
+        return self
+
+    def add_error(self, line, errors):
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def build(self, line, row):
+        form = TelemetryReadingForm(data=row)
+        if not form.is_valid():
+            self.add_error(line, dict(form.errors))
+            return None
+        return VehicleHistory(
+            vehicle_id=form.cleaned_data['vehicle'],
+            recorded_at=form.cleaned_data['recorded_at'],
+            mileage=form.cleaned_data['mileage'],
+            source=VehicleHistory.Source.TELEMETRY,
+        )
+
+    def flush(self, batch):
+        if not batch:
+            return
+        known = set(
+            Vehicle.objects.filter(id__in={reading.vehicle_id for _, reading in batch})
+            .values_list('id', flat=True)
+        )
+        readings = []
+        for line, reading in batch:
+            if reading.vehicle_id in known:
+                readings.append(reading)
+            else:
+                self.add_error(line, {'vehicle': [f'Неизвестная техника: {reading.vehicle_id!r}']})
+        if not readings:
+            return
+        latest = {}
+        for reading in readings:
+            current = latest.get(reading.vehicle_id)
+            if current is None or reading.recorded_at > current.recorded_at:
+                latest[reading.vehicle_id] = reading
+        now = timezone.now()
+        with transaction.atomic():
+            VehicleHistory.objects.bulk_create(readings)
+            if journal_available():
+                with connection.cursor() as cursor:
+                    # Показания уже в истории, триггер не должен дублировать их строками правок
+                    cursor.execute("SELECT set_config('vehicle.skip_history', 'on', true)")
+                    cursor.execute(UPDATE_MILEAGE_SQL, [
+                        now, list(latest), [reading.mileage for reading in latest.values()]
+                    ])
+                    cursor.execute("SELECT set_config('vehicle.skip_history', 'off', true)")
+            else:
+                # Без триггеров дублей нет, а UPDATE ... FROM unnest() есть только в PostgreSQL
+                for vehicle_id, reading in latest.items():
+                    Vehicle.objects.filter(pk=vehicle_id, mileage__lt=reading.mileage).update(
+                        mileage=reading.mileage, updated_at=now
+                    )
+            page_cache.invalidate()
+        self.created += len(readings)
+
+    def report(self):
+        return {'created': self.created, 'errors': self.errors}
+
+
+def downtime_rows(start, end, group, join='', vehicle_id=None):
+    if not journal_available():
+        raise NotSupportedError('Отчёты о простое строятся по журналу, который ведут триггеры PostgreSQL')
+    # Будущее ещё не наступило: период обрезается по текущему моменту, а период
+    # целиком в будущем не даёт строк, а не отрицательный простой
+    now = timezone.now()
+    start, end = min(start, now), min(end, now)
+    if start >= end:
+        return []
+    vehicle = 'AND vehicle_id = %(vehicle_id)s' if vehicle_id is not None else ''
+    sql = DOWNTIME_SQL.format(vehicle=vehicle, group=group, join=join)
+    params = {'start': start, 'end': end, 'statuses': DOWNTIME_STATUSES, 'vehicle_id': vehicle_id}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def hours(seconds):
+    return round(float(seconds) / 3600, 2)
+
+
+def vehicle_downtime(vehicle_id, start, end):
+    """Часы простоя и ремонта одной техники за период и рост пробега по журналу."""
+    rows = downtime_rows(start, end, 'i.vehicle_id', vehicle_id=vehicle_id)
+    downtime = {status: 0.0 for status in DOWNTIME_STATUSES}
+    for _, status, seconds, _ in rows:
+        downtime[status] = hours(seconds)
+    mileage = VehicleHistory.objects.filter(
+        vehicle_id=vehicle_id, mileage__isnull=False, recorded_at__gte=start, recorded_at__lt=end
+    ).aggregate(first=Min('mileage'), last=Max('mileage'))
+    return {
+        'vehicle_id': vehicle_id,
+        'start': start,
+        'end': end,
+        'downtime_hours': downtime,
+        'mileage': {
+            **mileage,
+            'growth': mileage['last'] - mileage['first'] if mileage['last'] is not None else None,
+        },
+    }
+
+
+def fleet_downtime(start, end):
+    """Часы простоя и ремонта по парку за период: итог по статусам и по типам техники."""
+    rows = downtime_rows(start, end, 'v.type_id', join='JOIN vehicle_vehicle v ON v.id = i.vehicle_id')
+    by_status = {status: {'hours': 0.0, 'vehicles': 0} for status in DOWNTIME_STATUSES}
+    by_type = {}
+    for type_id, status, seconds, vehicles in rows:
+        by_status[status]['hours'] += float(seconds) / 3600
+        by_status[status]['vehicles'] += vehicles
+        row = by_type.setdefault(type_id, {'type_id': type_id, **{key: 0.0 for key in DOWNTIME_STATUSES}})
+        row[status] = hours(seconds)
+    for totals in by_status.values():
+        totals['hours'] = round(totals['hours'], 2)
+    return {'start': start, 'end': end, 'by_status': by_status, 'by_type': list(by_type.values())}
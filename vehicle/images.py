@@ -0,0 +1,85 @@
+import hashlib
+import io
+import os
+import tempfile
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+from .models import VehicleImage
+
+# Формат хранения: (формат Pillow, расширение, параметры сохранения)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'method': 4}),
+    'avif': ('AVIF', 'avif', {}),
+    'jpeg': ('JPEG', 'jpg', {'progressive': True, 'optimize': True}),
+}
+CONTENT_NAME_REGEX = r'^vehicle_images/[0-9a-f]{2}/[0-9a-f]{64}\.'
+
+
+def storage():
+    return VehicleImage._meta.get_field('file').storage
+
+
+def content_name(upload):
+    """
+    Имя файла по SHA-256 исходных байт и параметров нормализации: одно и то же фото
+    получает одно имя, и повторная загрузка не перекодируется и не пишется заново.
+    """
+    _, extension, _ = FORMATS[settings.VEHICLE_IMAGE_FORMAT]
+    digest = hashlib.sha256(
+        f'{settings.VEHICLE_IMAGE_FORMAT}:{settings.VEHICLE_IMAGE_MAX_SIZE}:{settings.VEHICLE_IMAGE_QUALITY}:'.encode()
+    )
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    digest = digest.hexdigest()
+    return f'vehicle_images/{digest[:2]}/{digest}.{extension}'
+
+
+def normalize(upload):
+    """
+    Уменьшает фото до VEHICLE_IMAGE_MAX_SIZE по большей стороне, поворачивает по EXIF
+    и перекодирует в VEHICLE_IMAGE_FORMAT без метаданных (EXIF, GPS, ICC).
+    """
+    fmt, _, options = FORMATS[settings.VEHICLE_IMAGE_FORMAT]
+    max_size = settings.VEHICLE_IMAGE_MAX_SIZE
+    upload.seek(0)
+    with Image.open(upload) as image:
+        # JPEG декодируется сразу в уменьшенном масштабе (1/2, 1/4, 1/8), не целиком
+        image.draft('RGB', (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha and fmt != 'JPEG' else 'RGB')
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, fmt, quality=settings.VEHICLE_IMAGE_QUALITY, **options)
+    return buffer.getvalue()
+
+
+def store(upload):
+    """
+    Сохраняет нормализованное фото; возвращает (имя, записан ли новый файл).
+    Файл пишется во временный и публикуется под именем по хэшу через os.link, который
+    не перезаписывает существующий файл: из двух одновременных загрузок одного фото
+    вторая получает FileExistsError и переиспользует файл, а не сохраняет копию под
+    другим именем, как сделал бы storage.save(). Поэтому нужно локальное хранилище
+    с path() (FileSystemStorage).
+    """
+    name = content_name(upload)
+    if storage().exists(name):
+        return name, False
+    content = normalize(upload)
+    path = storage().path(name)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix='.upload-', delete=False) as temporary:
+        temporary.write(content)
+    try:
+        if settings.FILE_UPLOAD_PERMISSIONS is not None:
+            os.chmod(temporary.name, settings.FILE_UPLOAD_PERMISSIONS)
+        os.link(temporary.name, path)
+    except FileExistsError:
+        return name, False
+    finally:
+        os.unlink(temporary.name)
+    return name, True
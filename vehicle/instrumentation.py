@@ -0,0 +1,251 @@
+import contextvars
+import cProfile
+import ipaddress
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from sorl.thumbnail.base import ThumbnailBackend
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('vehicle_request_metrics', default=None)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PHASES = ('sql', 'render', 'thumbnail')
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = None
+        self.counts = dict.fromkeys(PHASES, 0)
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+
+    def add(self, phase, seconds):
+        self.counts[phase] += 1
+        self.seconds[phase] += seconds
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def server_timing(self):
+        parts = [f'total;dur={self.duration * 1000:.1f}']
+        for phase in PHASES:
+            if self.counts[phase]:
+                parts.append(f'{phase};dur={self.seconds[phase] * 1000:.1f};desc="{self.counts[phase]}"')
+        return ', '.join(parts)
+
+
+def timed(phase, func, *args, **kwargs):
+    metrics = _current.get()
+    if metrics is None:
+        return func(*args, **kwargs)
+    started = time.perf_counter()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        metrics.add(phase, time.perf_counter() - started)
+
+
+def sql_timer(execute, sql, params, many, context):
+    return timed('sql', execute, sql, params, many, context)
+
+
+def install_sql_timer(sender, connection, **kwargs):
+    """
+    Обработчик connection_created: обёртка ставится на каждое соединение, поэтому
+    учитываются и запросы async-представлений из потоков sync_to_async
+    (контекст запроса передаётся туда вместе с contextvars).
+    """
+    if sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(sql_timer)
+
+
+class TimedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl.thumbnail, который учитывает время {% thumbnail %} в метриках запроса."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        return timed('thumbnail', super().get_thumbnail, file_, geometry_string, **options)
+
+
+class MetricsRegistry:
+    """Агрегаты по представлениям в памяти процесса: каждый воркер gunicorn отдаёт свои."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.buckets = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self.duration = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def observe(self, view, method, status, metrics):
+        with self.lock:
+            self.requests[view, method, status] += 1
+            self.duration[view] += metrics.duration
+            buckets = self.buckets[view]
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if metrics.duration <= bound:
+                    buckets[index] += 1
+            for phase in PHASES:
+                self.counts[view, phase] += metrics.counts[phase]
+                self.seconds[view, phase] += metrics.seconds[phase]
+
+    def render(self):
+        with self.lock:
+            lines = [
+                '# HELP vehicle_http_requests_total Запросы по представлению, методу и статусу',
+                '# TYPE vehicle_http_requests_total counter',
+            ]
+            for (view, method, status), value in sorted(self.requests.items()):
+                lines.append(f'vehicle_http_requests_total{{view="{view}",method="{method}",status="{status}"}} {value}')
+
+            lines += [
+                '# HELP vehicle_http_request_duration_seconds Время обработки запроса',
+                '# TYPE vehicle_http_request_duration_seconds histogram',
+            ]
+            for view, buckets in sorted(self.buckets.items()):
+                total = sum(value for (name, _, _), value in self.requests.items() if name == view)
+                for bound, value in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'vehicle_http_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {value}')
+                lines.append(f'vehicle_http_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {total}')
+                lines.append(f'vehicle_http_request_duration_seconds_sum{{view="{view}"}} {self.duration[view]:.6f}')
+                lines.append(f'vehicle_http_request_duration_seconds_count{{view="{view}"}} {total}')
+
+            for phase in PHASES:
+                lines += [
+                    f'# HELP vehicle_{phase}_total Число операций ({phase}) по представлению',
+                    f'# TYPE vehicle_{phase}_total counter',
+                ]
+                lines += [
+                    f'vehicle_{phase}_total{{view="{view}"}} {value}'
+                    for (view, name), value in sorted(self.counts.items()) if name == phase
+                ]
+                lines += [
+                    f'# HELP vehicle_{phase}_seconds_total Суммарное время ({phase}) по представлению',
+                    f'# TYPE vehicle_{phase}_seconds_total counter',
+                ]
+                lines += [
+                    f'vehicle_{phase}_seconds_total{{view="{view}"}} {value:.6f}'
+                    for (view, name), value in sorted(self.seconds.items()) if name == phase
+                ]
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+_profile_lock = threading.Lock()
+
+
+def metrics_allowed(request):
+    """
+    Доступ к метрикам: с адресов VEHICLE_METRICS_ALLOWED_NETWORKS или с заголовком
+    Authorization: Bearer <VEHICLE_METRICS_TOKEN>. Проверка дублирует правило nginx
+    на случай запроса напрямую в порт gunicorn.
+    """
+    token = settings.VEHICLE_METRICS_TOKEN
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in settings.VEHICLE_METRICS_ALLOWED_NETWORKS)
+
+
+def metrics_view(request):
+    if not settings.VEHICLE_METRICS_ENABLED or not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет время запроса, SQL, рендеринга шаблона и миниатюр, отдаёт их
+    в заголовке Server-Timing и копит агрегаты для metrics_view.
+
+    cProfile включается для доли запросов VEHICLE_PROFILE_SAMPLE_RATE или по заголовку
+    X-Profile с токеном VEHICLE_PROFILE_TOKEN; профиль пишется в VEHICLE_PROFILE_DIR.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        profiler = self.start_profiler(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+            self.stop_profiler(request, profiler)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        # В async-режиме профилируется только поток event loop, без запросов в sync_to_async
+        profiler = self.start_profiler(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+            self.stop_profiler(request, profiler)
+        return self.finish(request, response, metrics)
+
+    def process_template_response(self, request, response):
+        metrics = _current.get()
+        if metrics is not None:
+            # Рендеринг выполняет обработчик позже (в async-режиме — в отдельном потоке),
+            # поэтому оборачиваем сам render, а не рендерим здесь
+            render = response.render
+            response.render = lambda: timed('render', render)
+        return response
+
+    def finish(self, request, response, metrics):
+        metrics.finish()
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        registry.observe(view, request.method, response.status_code, metrics)
+        if settings.VEHICLE_SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing()
+        return response
+
+    def start_profiler(self, request):
+        token = settings.VEHICLE_PROFILE_TOKEN
+        requested = bool(token) and constant_time_compare(request.headers.get('X-Profile', ''), token)
+        sampled = settings.VEHICLE_PROFILE_SAMPLE_RATE and random.random() < settings.VEHICLE_PROFILE_SAMPLE_RATE
+        # Одновременно работает один профилировщик: конкурирующие запросы пропускаем
+        if not (requested or sampled) or not _profile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def stop_profiler(self, request, profiler):
+        if profiler is None:
+            return
+        try:
+            profiler.disable()
+            directory = Path(settings.VEHICLE_PROFILE_DIR)
+            directory.mkdir(parents=True, exist_ok=True)
+            name = request.path.strip('/').replace('/', '_') or 'root'
+            path = directory / f'{time.strftime("%Y%m%d-%H%M%S")}-{name}-{time.perf_counter_ns()}.prof'
+            profiler.dump_stats(path)
+            logger.info('Профиль запроса %s сохранён в %s', request.path, path)
+        finally:
+            _profile_lock.release()
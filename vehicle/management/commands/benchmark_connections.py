@@ -0,0 +1,69 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+DEFAULT_PATHS = ['/vehicle/vehicles/', '/vehicle/api/vehicle-types/']
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает запросы с новым соединением к БД и с постоянным (CONN_MAX_AGE). '
+        'Для проверки через pgbouncer запустите с DB_POOL_MODE=pgbouncer'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Запросов на каждый путь')
+        parser.add_argument('--path', action='append', dest='paths')
+        parser.add_argument('--max-age', type=int, action='append', dest='max_ages',
+                            help='Значения CONN_MAX_AGE для сравнения (по умолчанию 0 и 60)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'Режим: {settings.DB_POOL_MODE}, '
+            f'{connection.settings_dict["HOST"] or "localhost"}:{connection.settings_dict["PORT"] or 5432}'
+        )
+        self.stdout.write(f'Установка соединения: {self.connect_cost() * 1000:.2f} мс')
+
+        client = Client()
+        for max_age in options['max_ages'] or [0, 60]:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+            for path in options['paths'] or DEFAULT_PATHS:
+                elapsed, opened = self.run(client, path, options['requests'])
+                self.stdout.write(
+                    f'CONN_MAX_AGE={max_age} {path}: {elapsed / options["requests"] * 1000:.2f} мс/запрос, '
+                    f'новых соединений {opened}'
+                )
+        connection.close()
+
+    def connect_cost(self, rounds=20):
+        connection.close()
+        started = time.perf_counter()
+        for _ in range(rounds):
+            connection.ensure_connection()
+            connection.close()
+        return (time.perf_counter() - started) / rounds
+
+    def run(self, client, path, requests):
+        opened = []
+
+        def on_connect(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        connection_created.connect(on_connect)
+        try:
+            started = time.perf_counter()
+            for _ in range(requests):
+                response = client.get(path)
+                if response.status_code != 200:
+                    raise CommandError(f'{path}: статус {response.status_code}')
+                # Тестовый Client отключает close_old_connections, а обработчик сервера
+                # вызывает его в конце каждого запроса — повторяем это вручную
+                close_old_connections()
+            return time.perf_counter() - started, len(opened)
+        finally:
+            connection_created.disconnect(on_connect)
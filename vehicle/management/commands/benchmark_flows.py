@@ -0,0 +1,206 @@
+import json
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from vehicle.fleet import BRANDS, FleetGenerator
+from vehicle.models import Vehicle, VehicleImage, VehicleType
+
+FLOWS = ('list', 'filtered_list', 'detail', 'create', 'update', 'cascade_delete')
+BASELINE_DIR = settings.BASE_DIR / 'benchmarks'
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет сценарии (список, фильтр, карточка, создание, редактирование, каскадное удаление) '
+        'через тестовый клиент на синтетическом парке в отдельной тестовой БД; '
+        'выводит p50/p95/p99 и число запросов, сохраняет и сравнивает базовые замеры'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--types', type=int, default=20)
+        parser.add_argument('--vehicles', type=int, default=5000)
+        parser.add_argument('--images', type=int, default=10_000)
+        parser.add_argument('--photos', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--flow', choices=FLOWS, action='append', dest='flows')
+        parser.add_argument('--save', metavar='NAME', help='Сохранить результат в benchmarks/NAME.json')
+        parser.add_argument('--compare', metavar='NAME', help='Сравнить с benchmarks/NAME.json')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Допустимый рост p95 при сравнении (доля)')
+
+    def handle(self, *args, **options):
+        baseline = self.load(options['compare']) if options['compare'] else None
+        media_root = tempfile.mkdtemp()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Фоновые задачи выполняются синхронно, чтобы их стоимость попадала в замер,
+            # а кэш изолирован от рабочего
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                VEHICLE_THUMBNAIL_PREGENERATE=False,
+                SOFT_DELETE_IN_BACKGROUND=False,
+                VEHICLE_SERVER_TIMING=False,
+                CACHES={
+                    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                    'pages': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pages'},
+                },
+            ):
+                results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        self.report(results, baseline, options['threshold'])
+        if options['save']:
+            self.save(options['save'], results, options)
+
+    def run(self, options):
+        started = time.perf_counter()
+        fleet = FleetGenerator(seed=options['seed'], photos=options['photos']).run(
+            options['types'], options['vehicles'], options['images']
+        )
+        self.stdout.write(
+            f'Парк: типов {len(fleet.types)}, техники {fleet.vehicles}, фото {fleet.images} '
+            f'({time.perf_counter() - started:.1f} с)'
+        )
+        self.rng = random.Random(options['seed'])
+        self.client = Client()
+        self.vehicle_ids = list(Vehicle.alive.values_list('pk', flat=True))
+        self.type_ids = [vehicle_type.pk for vehicle_type in fleet.types]
+        self.per_type = max(1, options['vehicles'] // max(1, options['types']))
+
+        results = {}
+        for flow in options['flows'] or FLOWS:
+            step = getattr(self, f'flow_{flow}')
+            step()  # прогрев: шаблоны, кэш типов, пул соединений
+            timings, queries = [], []
+            for _ in range(options['iterations']):
+                elapsed, count = step()
+                timings.append(elapsed * 1000)
+                queries.append(count)
+            results[flow] = {
+                'p50': round(percentile(timings, 0.5), 2),
+                'p95': round(percentile(timings, 0.95), 2),
+                'p99': round(percentile(timings, 0.99), 2),
+                'queries': round(sum(queries) / len(queries), 2),
+                'max_queries': max(queries),
+            }
+        return results
+
+    def measure(self, method, url, data=None, expected=200):
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(url, data)
+            elapsed = time.perf_counter() - started
+        if response.status_code != expected:
+            raise CommandError(f'{method.upper()} {url}: статус {response.status_code}, ожидался {expected}')
+        return elapsed, len(context.captured_queries)
+
+    def vehicle_data(self, **extra):
+        return {
+            'reg_number': f'Б{self.rng.randrange(1000):03d}ЕН77',
+            'brand': self.rng.choice(BRANDS)[0],
+            'date_purchase': '2024-01-01',
+            'type': self.rng.choice(self.type_ids),
+            'mileage': str(self.rng.randrange(1, 500_000)),
+            'operation_status': 'IN_OP',
+            **extra,
+        }
+
+    def flow_list(self):
+        return self.measure('get', reverse('vehicle:vehicle_list'), {'page': self.rng.randint(1, 20)})
+
+    def flow_filtered_list(self):
+        brand = self.rng.choice(BRANDS)[0]
+        return self.measure('get', reverse('vehicle:vehicle_list'), {'brand': brand[:3].lower(), 'search': 'any'})
+
+    def flow_detail(self):
+        return self.measure('get', reverse('vehicle:vehicle_detail', args=[self.rng.choice(self.vehicle_ids)]))
+
+    def flow_create(self):
+        return self.measure('post', reverse('vehicle:vehicle_create'), self.vehicle_data(), expected=302)
+
+    def flow_update(self):
+        vehicle_id = self.rng.choice(self.vehicle_ids)
+        image_ids = list(VehicleImage.alive.filter(vehicle_id=vehicle_id).order_by('id').values_list('pk', flat=True))
+        data = self.vehicle_data(**{'images-TOTAL_FORMS': len(image_ids), 'images-INITIAL_FORMS': len(image_ids)})
+        for i, image_id in enumerate(image_ids):
+            data[f'images-{i}-id'] = image_id
+            data[f'images-{i}-vehicle'] = vehicle_id
+        return self.measure('post', reverse('vehicle:vehicle_update', args=[vehicle_id]), data, expected=302)
+
+    def flow_cascade_delete(self):
+        # Удаляется отдельный тип со средним для парка числом техники и фото
+        fleet = FleetGenerator(seed=self.rng.randrange(10 ** 6), deleted_ratio=0).run(
+            1, self.per_type, self.per_type * 2, type_names=['Бенчмарк удаления']
+        )
+        vehicle_type = fleet.types[0]
+        result = self.measure('post', reverse('vehicle:vehicletype_delete', args=[vehicle_type.pk]), expected=302)
+        if not VehicleType.objects.filter(pk=vehicle_type.pk, is_deleted=True).exists():
+            raise CommandError('Тип техники не удалён')
+        return result
+
+    def report(self, results, baseline, threshold):
+        self.stdout.write(f'{"сценарий":<16}{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}{"запросов":>10}')
+        regressions = []
+        for flow, row in results.items():
+            line = f'{flow:<16}{row["p50"]:>10.1f}{row["p95"]:>10.1f}{row["p99"]:>10.1f}{row["queries"]:>10.1f}'
+            before = (baseline or {}).get('flows', {}).get(flow)
+            if before:
+                change = (row['p95'] - before['p95']) / before['p95'] if before['p95'] else 0
+                line += f'   p95 {change:+.0%}, запросов {row["queries"] - before["queries"]:+.1f}'
+                if change > threshold or row['queries'] > before['queries']:
+                    regressions.append(flow)
+                    line += '  ← регрессия'
+            self.stdout.write(line)
+        if baseline:
+            self.stdout.write(f'База: {baseline.get("commit") or "?"} от {baseline.get("created")}')
+            if regressions:
+                raise CommandError(f'Регрессии относительно базы: {", ".join(regressions)}')
+
+    def load(self, name):
+        path = BASELINE_DIR / f'{name}.json'
+        if not path.exists():
+            raise CommandError(f'Нет базового замера {path}')
+        return json.loads(path.read_text())
+
+    def save(self, name, results, options):
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f'{name}.json'
+        data = {
+            'commit': self.git_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'config': {
+                key: options[key] for key in ('types', 'vehicles', 'images', 'photos', 'seed', 'iterations')
+            },
+            'flows': results,
+        }
+        path.write_text(json.dumps(data, ensure_ascii=False, indent=2) + '\n')
+        self.stdout.write(f'Базовый замер сохранён в {path}')
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
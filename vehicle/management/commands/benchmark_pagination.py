@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory, override_settings
+
+from vehicle.fleet import FleetGenerator
+from vehicle.models import Vehicle
+from vehicle.pagination import FORWARD, encode_cursor
+from vehicle.views import VehicleListView
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает время отдачи глубокой страницы списка техники в offset- и cursor-режимах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200_000)
+        parser.add_argument('--page', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--keep', action='store_true', help='Не откатывать сгенерированные данные')
+
+    def handle(self, *args, **options):
+        if options['page'] < 1:
+            raise CommandError('Номер страницы должен быть не меньше 1')
+        # Кэш страниц отключён: иначе после первого запроса замер показывал бы чтение из кэша
+        with transaction.atomic(), override_settings(VEHICLE_PAGE_CACHE_TIMEOUT=0):
+            self.seed(options['rows'])
+            self.run(options['page'], options['repeat'])
+            if not options['keep']:
+                transaction.set_rollback(True)
+
+    def seed(self, rows):
+        FleetGenerator(deleted_ratio=0).run(1, rows, 0, type_names=['Бенчмарк'])
+        self.stdout.write(f'Сгенерировано записей: {rows}')
+
+    def run(self, page, repeat):
+        view = VehicleListView.as_view()
+        factory = RequestFactory()
+        per_page = VehicleListView.paginate_by
+
+        modes = {
+            'offset': {'page': page},
+            'cursor': {'mode': 'cursor'},
+        }
+        # Первая страница в cursor-режиме открывается без курсора, для остальных
+        # курсор указывает на последнюю запись предыдущей страницы
+        if page > 1:
+            index = (page - 1) * per_page - 1
+            boundary = Vehicle.alive.order_by('created_at', 'pk')[index:index + 1].first()
+            if boundary is None:
+                raise CommandError(f'Страница {page} за пределами списка')
+            modes['cursor']['cursor'] = encode_cursor(FORWARD, boundary.created_at, boundary.pk)
+        for name, params in modes.items():
+            timings = []
+            for _ in range(repeat):
+                request = factory.get('/vehicle/vehicles/', params)
+                started = time.perf_counter()
+                view(request).render()
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            self.stdout.write(
+                f'{name:>6}: страница {page}, медиана {timings[len(timings) // 2] * 1000:.2f} мс, '
+                f'максимум {timings[-1] * 1000:.2f} мс'
+            )
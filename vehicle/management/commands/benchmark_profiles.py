@@ -0,0 +1,127 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+PROFILES = {
+    'dev': {
+        'command': [sys.executable, 'manage.py', 'runserver', '--noreload', '127.0.0.1:{port}'],
+        'env': {'DEBUG': 'True'},
+    },
+    'wsgi': {
+        'command': ['gunicorn', '-c', 'gunicorn.conf.py', '--bind', '127.0.0.1:{port}'],
+        'env': {'DEBUG': 'False', 'SERVER_MODE': 'wsgi', 'GUNICORN_ACCESSLOG': ''},
+    },
+    'asgi': {
+        'command': ['gunicorn', '-c', 'gunicorn.conf.py', '--bind', '127.0.0.1:{port}'],
+        'env': {'DEBUG': 'False', 'SERVER_MODE': 'asgi', 'GUNICORN_ACCESSLOG': '', 'VEHICLE_ASYNC_VIEWS': 'False'},
+    },
+    'asgi-async': {
+        'command': ['gunicorn', '-c', 'gunicorn.conf.py', '--bind', '127.0.0.1:{port}'],
+        'env': {'DEBUG': 'False', 'SERVER_MODE': 'asgi', 'GUNICORN_ACCESSLOG': '', 'VEHICLE_ASYNC_VIEWS': 'True'},
+    },
+}
+
+
+def tree_rss_kb(pid):
+    """Суммарный RSS процесса и всех его потомков (Linux /proc)."""
+    children = {}
+    for stat in Path('/proc').glob('[0-9]*/stat'):
+        try:
+            fields = stat.read_text().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(stat.parent.name))
+
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        stack.extend(children.get(current, []))
+        try:
+            for line in Path(f'/proc/{current}/status').read_text().splitlines():
+                if line.startswith('VmRSS:'):
+                    total += int(line.split()[1])
+        except OSError:
+            pass
+    return total
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает пропускную способность и память dev-профиля (runserver) и production (gunicorn)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=PROFILES, action='append', dest='profiles')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--path', action='append', dest='paths')
+        parser.add_argument('--page-cache', action='store_true',
+                            help='Не отключать кэш страниц: по умолчанию замер идёт по коду представлений')
+
+    def handle(self, *args, **options):
+        # Production-профиль отдаёт статику через манифест; собираем его с DEBUG=False,
+        # иначе collectstatic использует обычное хранилище без манифеста
+        subprocess.run(
+            [sys.executable, 'manage.py', 'collectstatic', '--noinput', '-v', '0'],
+            cwd=settings.BASE_DIR, env={**os.environ, 'DEBUG': 'False'}, check=True,
+        )
+        for name in options['profiles'] or PROFILES:
+            self.run_profile(name, PROFILES[name], options)
+
+    def run_profile(self, name, profile, options):
+        port = options['port']
+        command = [part.format(port=port) for part in profile['command']]
+        env = {**os.environ, **profile['env']}
+        if not options['page_cache']:
+            env['VEHICLE_PAGE_CACHE_TIMEOUT'] = '0'
+        server = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            self.wait_ready(port, server)
+            peak = {'rss': tree_rss_kb(server.pid)}
+            idle_rss = peak['rss']
+            stop = threading.Event()
+
+            def sample():
+                while not stop.wait(0.2):
+                    peak['rss'] = max(peak['rss'], tree_rss_kb(server.pid))
+
+            sampler = threading.Thread(target=sample, daemon=True)
+            sampler.start()
+            self.stdout.write(self.style.MIGRATE_HEADING(f'[{name}] {" ".join(command)}'))
+            call_command(
+                'loadtest',
+                base_url=f'http://127.0.0.1:{port}',
+                paths=options['paths'],
+                requests=options['requests'],
+                concurrency=options['concurrency'],
+                stdout=self.stdout,
+            )
+            stop.set()
+            sampler.join()
+            self.stdout.write(
+                f'Память: после старта {idle_rss / 1024:.0f} МБ, пик под нагрузкой {peak["rss"] / 1024:.0f} МБ'
+            )
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    def wait_ready(self, port, server):
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Сервер завершился с кодом {server.returncode}')
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/vehicle/vehicles/', timeout=2).read()
+                return
+            except OSError:
+                time.sleep(0.3)
+        raise CommandError('Сервер не ответил за 30 секунд')
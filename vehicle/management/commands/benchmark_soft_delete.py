@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+
+from vehicle.fleet import FleetGenerator
+from vehicle.models import SoftDeleteJob, Vehicle, VehicleImage
+from vehicle.services import process_soft_delete_batch
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает каскадное удаление типа техники одной транзакцией и пачками '
+        'на синтетическом парке в отдельной тестовой БД'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicles', type=int, default=100_000)
+        parser.add_argument('--images-per-vehicle', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # Пачки должны фиксироваться по отдельности, поэтому замер идёт не в откатываемой
+        # транзакции, а в тестовой БД, которая затем удаляется целиком
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Кэш изолирован от рабочего: пачки сбрасывают кэш страниц
+            with override_settings(CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'pages': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'pages'},
+            }):
+                vehicle_type = self.seed(options['vehicles'], options['images_per_vehicle'])
+                self.run_single_transaction(vehicle_type)
+                self.run_batched(vehicle_type, options['batch_size'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, vehicles, images_per_vehicle):
+        fleet = FleetGenerator(deleted_ratio=0).run(
+            1, vehicles, vehicles * images_per_vehicle, type_names=['Бенчмарк удаления']
+        )
+        self.stdout.write(f'Сгенерировано: техники {fleet.vehicles}, фото {fleet.images}')
+        return fleet.types[0]
+
+    def run_single_transaction(self, vehicle_type):
+        # Прежняя реализация VehicleTypeDeleteView: весь каскад в одной транзакции
+        with transaction.atomic():
+            started = time.perf_counter()
+            vehicles = Vehicle.objects.filter(type=vehicle_type)
+            vehicles.update(is_deleted=True)
+            VehicleImage.objects.filter(vehicle__in=vehicles).update(is_deleted=True)
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f'Одна транзакция: всего {elapsed * 1000:.0f} мс, блокировки удерживаются {elapsed * 1000:.0f} мс'
+        )
+
+    def run_batched(self, vehicle_type, batch_size):
+        job = SoftDeleteJob.objects.create(vehicle_type=vehicle_type)
+        timings = []
+        started = time.perf_counter()
+        while True:
+            batch_started = time.perf_counter()
+            if not process_soft_delete_batch(job, batch_size):
+                break
+            timings.append(time.perf_counter() - batch_started)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Пачками по {batch_size}: всего {elapsed * 1000:.0f} мс, {len(timings)} транзакций, '
+            f'самая долгая {max(timings, default=0) * 1000:.0f} мс'
+        )
@@ -0,0 +1,72 @@
+import io
+import shutil
+import tempfile
+import time
+from datetime import date
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import delete
+
+from vehicle.models import Vehicle, VehicleImage, VehicleType
+from vehicle.thumbnails import submit
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает p95 первого открытия карточки техники без и с предсозданием миниатюр'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vehicles', type=int, default=20)
+        parser.add_argument('--images', type=int, default=6, help='Фото на единицу техники')
+        parser.add_argument('--size', type=int, default=3000, help='Ширина исходного фото, px')
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root, VEHICLE_THUMBNAIL_PREGENERATE=False):
+                self.vehicle_type = VehicleType.objects.create(name='Бенчмарк миниатюр')
+                photo = self.make_photo(options['size'])
+                lazy = self.measure(options, photo, pregenerate=False)
+                eager = self.measure(options, photo, pregenerate=True)
+        finally:
+            for image in VehicleImage.objects.filter(vehicle__type__name='Бенчмарк миниатюр'):
+                delete(image.file, delete_file=False)
+            VehicleType.objects.filter(name='Бенчмарк миниатюр').delete()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        self.stdout.write(f'Ленивая генерация: p95 {self.p95(lazy):.0f} мс')
+        self.stdout.write(f'Предсоздание:      p95 {self.p95(eager):.0f} мс')
+
+    def make_photo(self, width):
+        buffer = io.BytesIO()
+        Image.effect_noise((width, width * 3 // 4), 64).convert('RGB').save(buffer, 'JPEG', quality=90)
+        return buffer.getvalue()
+
+    def measure(self, options, photo, pregenerate):
+        client = Client()
+        timings = []
+        for i in range(options['vehicles']):
+            vehicle = Vehicle.objects.create(
+                reg_number=f'T{i:04d}', brand='УРАЛ', date_purchase=date(2024, 1, 1),
+                type=self.vehicle_type, mileage=0
+            )
+            images = [
+                VehicleImage.objects.create(
+                    vehicle=vehicle, file=SimpleUploadedFile(f'bench_{i}_{j}.jpg', photo)
+                )
+                for j in range(options['images'])
+            ]
+            if pregenerate:
+                submit(image.file.name for image in images).result()
+
+            started = time.perf_counter()
+            client.get(reverse('vehicle:vehicle_detail', args=[vehicle.pk]))
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def p95(self, timings):
+        timings = sorted(timings)
+        return timings[min(len(timings) - 1, int(len(timings) * 0.95))]
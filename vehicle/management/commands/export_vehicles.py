@@ -0,0 +1,20 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from vehicle.transfer import FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = 'Выгружает технику в CSV или JSONL (в файл или stdout)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', help='Путь к файлу; по умолчанию stdout')
+
+    def handle(self, *args, **options):
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as stream:
+                stream.writelines(iter_export(options['format']))
+        else:
+            sys.stdout.writelines(iter_export(options['format']))
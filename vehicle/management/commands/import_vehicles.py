@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from vehicle.transfer import FORMATS, VehicleImporter, detect_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Импортирует технику из CSV или JSONL файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--create-types', action='store_true', help='Создавать отсутствующие типы техники')
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        importer = VehicleImporter(options['batch_size'], options['create_types'])
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                importer.run(iter_rows(stream, fmt))
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'{exc} (импортировано: {importer.created})')
+
+        for error in importer.errors:
+            self.stderr.write(f'Строка {error["line"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(f'Импортировано: {importer.created}'))
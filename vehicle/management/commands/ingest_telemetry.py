@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from vehicle.history import TelemetryIngest
+from vehicle.transfer import FORMATS, detect_format, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Загружает показания пробега (vehicle, recorded_at, mileage) из CSV или JSONL в журнал техники'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or detect_format(options['path'])
+        ingest = TelemetryIngest(options['batch_size'])
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                ingest.run(iter_rows(stream, fmt))
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'{exc} (загружено: {ingest.created})')
+
+        for error in ingest.errors:
+            self.stderr.write(f'Строка {error["line"]}: {error["errors"]}')
+        self.stdout.write(self.style.SUCCESS(f'Загружено показаний: {ingest.created}'))
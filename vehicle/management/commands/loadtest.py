@@ -0,0 +1,78 @@
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = [
+    '/vehicle/vehicles/',
+    '/vehicle/api/vehicles/',
+    '/vehicle/vehicle-types/',
+    '/vehicle/api/vehicle-types/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест запущенного сервера: req/s и задержки для HTML и JSON страниц. '
+        'Повторные запросы списков отдаются из кэша страниц (см. X-Page-Cache в отчёте); '
+        'чтобы мерить код представлений, запустите сервер с VEHICLE_PAGE_CACHE_TIMEOUT=0'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--path', action='append', dest='paths', help='Путь; можно указать несколько раз')
+        parser.add_argument('--requests', type=int, default=500, help='Запросов на каждый путь')
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--conditional', action='store_true',
+                            help='Повторять запросы с If-None-Match из первого ответа (проверка 304)')
+
+    def handle(self, *args, **options):
+        for path in options['paths'] or DEFAULT_PATHS:
+            url = options['base_url'].rstrip('/') + path
+            headers = {}
+            if options['conditional']:
+                etag = self.fetch(url, {})[2]
+                if etag:
+                    headers['If-None-Match'] = etag
+            self.report(path, self.run(url, headers, options['requests'], options['concurrency']))
+
+    def fetch(self, url, headers):
+        request = urllib.request.Request(url, headers=headers)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                status, etag = response.status, response.headers.get('ETag')
+                page_cache = response.headers.get('X-Page-Cache')
+        except urllib.error.HTTPError as exc:
+            status, etag, page_cache = exc.code, exc.headers.get('ETag'), exc.headers.get('X-Page-Cache')
+        except OSError as exc:
+            # Таймауты и обрывы под нагрузкой считаем отдельным статусом, а не прерываем тест
+            status, etag, page_cache = type(exc).__name__, None, None
+        return status, time.perf_counter() - started, etag, page_cache
+
+    def run(self, url, headers, requests, concurrency):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            results = list(executor.map(lambda _: self.fetch(url, headers), range(requests)))
+        return results, time.perf_counter() - started
+
+    def report(self, path, run):
+        results, elapsed = run
+        timings = sorted(result[1] * 1000 for result in results)
+        statuses, page_cache = {}, {}
+        for status, _, _, cache_status in results:
+            statuses[status] = statuses.get(status, 0) + 1
+            if cache_status:
+                page_cache[cache_status] = page_cache.get(cache_status, 0) + 1
+
+        def percentile(p):
+            return timings[min(len(timings) - 1, int(len(timings) * p))]
+
+        self.stdout.write(
+            f'{path}: {len(results) / elapsed:.1f} req/s, '
+            f'p50 {percentile(0.5):.1f} мс, p95 {percentile(0.95):.1f} мс, p99 {percentile(0.99):.1f} мс, '
+            f'статусы {statuses}' + (f', кэш страниц {page_cache}' if page_cache else '')
+        )
@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+
+from vehicle import images, page_cache
+from vehicle.models import Vehicle, VehicleImage
+
+
+class Command(BaseCommand):
+    help = (
+        'Нормализует уже загруженные фото техники (без EXIF, уменьшенные, в VEHICLE_IMAGE_FORMAT) '
+        'и переносит их под имена по хэшу содержимого; одинаковые фото сливаются в один файл'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.VEHICLE_UPLOAD_WORKERS)
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--delete-originals', action='store_true',
+                            help='Удалить исходные файлы после переноса')
+
+    def handle(self, *args, **options):
+        names = list(
+            VehicleImage.objects.exclude(file='').exclude(file__regex=images.CONTENT_NAME_REGEX)
+            .order_by('file').values_list('file', flat=True).distinct()
+        )
+        converted = failed = 0
+        with ThreadPoolExecutor(options['workers']) as executor:
+            for start in range(0, len(names), options['batch_size']):
+                chunk = names[start:start + options['batch_size']]
+                renames = {
+                    old: new for old, new in zip(chunk, executor.map(self.convert, chunk)) if new
+                }
+                self.apply(renames, options['delete_originals'])
+                converted += len(renames)
+                failed += len(chunk) - len(renames)
+                self.stdout.write(f'Обработано файлов: {converted + failed} из {len(names)}')
+        self.stdout.write(self.style.SUCCESS(f'Готово: перенесено {converted}, с ошибками {failed}'))
+        if converted:
+            self.stdout.write('Миниатюры новых файлов создаёт команда pregenerate_thumbnails')
+
+    def convert(self, name):
+        try:
+            with images.storage().open(name) as file:
+                return images.store(file)[0]
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+            self.stderr.write(f'{name}: {exc}')
+            return None
+
+    def apply(self, renames, delete_originals):
+        if not renames:
+            return
+        now = timezone.now()
+        with transaction.atomic():
+            vehicle_ids = set(
+                VehicleImage.objects.filter(file__in=list(renames)).values_list('vehicle_id', flat=True)
+            )
+            for old, new in renames.items():
+                VehicleImage.objects.filter(file=old).update(file=new, updated_at=now)
+            # updated_at техники входит в ключ кэша фрагмента с фото
+            Vehicle.objects.filter(pk__in=vehicle_ids).update(updated_at=now)
+            page_cache.invalidate()
+        if delete_originals:
+            for old in renames:
+                images.storage().delete(old)
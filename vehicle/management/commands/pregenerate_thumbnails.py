@@ -0,0 +1,43 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from vehicle.models import VehicleImage
+from vehicle.thumbnails import pregenerate_many
+
+
+class Command(BaseCommand):
+    help = 'Параллельно создаёт миниатюры для уже загруженных фото техники'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.VEHICLE_THUMBNAIL_WORKERS)
+        parser.add_argument('--processes', action='store_true', help='Процессы вместо потоков')
+        parser.add_argument('--chunk-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        file_names = VehicleImage.alive.exclude(file='').values_list('file', flat=True)
+        chunks, chunk = [], []
+        for file_name in file_names.iterator():
+            chunk.append(file_name)
+            if len(chunk) == options['chunk_size']:
+                chunks.append(chunk)
+                chunk = []
+        if chunk:
+            chunks.append(chunk)
+
+        if options['processes']:
+            # Дочерние процессы не должны наследовать открытое соединение с БД
+            connections.close_all()
+            executor = ProcessPoolExecutor(options['workers'], mp_context=multiprocessing.get_context('fork'))
+        else:
+            executor = ThreadPoolExecutor(options['workers'])
+
+        done = 0
+        with executor:
+            for future in as_completed([executor.submit(pregenerate_many, chunk) for chunk in chunks]):
+                done += future.result()
+                self.stdout.write(f'Обработано фото: {done}')
+        self.stdout.write(self.style.SUCCESS(f'Готово, фото: {done}'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from vehicle.aggregates import check_counters, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики парка с таблицей техники и пересобирает их с нуля'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Только проверить, ничего не меняя')
+
+    def handle(self, *args, **options):
+        mismatches = check_counters()
+        for (type_id, status), (stored, actual) in sorted(mismatches.items(), key=str):
+            self.stdout.write(f'Тип {type_id}, статус {status}: сохранено {stored}, фактически {actual}')
+
+        if options['check']:
+            if mismatches:
+                raise CommandError(f'Расхождений: {len(mismatches)}')
+            self.stdout.write(self.style.SUCCESS('Счётчики совпадают'))
+            return
+
+        rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f'Счётчики пересобраны, исправлено расхождений: {len(mismatches)}'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from vehicle.services import claim_soft_delete_jobs, run_soft_delete_job
+
+
+class Command(BaseCommand):
+    help = (
+        'Доводит до конца незавершённые каскадные удаления типов техники: с ошибкой и брошенные '
+        '(без прогресса дольше SOFT_DELETE_STALE_AFTER секунд). Запускать по расписанию, например '
+        'cron раз в несколько минут: фоновые задания живут в потоке веб-воркера и пропадают при его перезапуске'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--stale-after', type=int,
+                            help='Через сколько секунд без прогресса задание считается брошенным')
+
+    def handle(self, *args, **options):
+        for job in claim_soft_delete_jobs(options['stale_after']):
+            run_soft_delete_job(job, options['batch_size'])
+            self.stdout.write(f'{job}: завершено')
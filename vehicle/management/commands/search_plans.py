@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from vehicle.models import Vehicle
+from vehicle.search import SearchMode, search_vehicles, trigram_available
+from vehicle.views import VehicleListView
+
+
+class Command(BaseCommand):
+    help = 'Показывает планы и время выполнения поисковых запросов по списку техники'
+
+    def add_arguments(self, parser):
+        parser.add_argument('query', help='Строка поиска, например УРАЛ')
+        parser.add_argument('--mode', choices=SearchMode.values, action='append',
+                            help='Режим поиска (по умолчанию все)')
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'База данных: {connection.vendor}, pg_trgm: {trigram_available()}')
+        for mode in options['mode'] or SearchMode.values:
+            qs = search_vehicles(
+                Vehicle.alive.with_list_data().order_by('created_at', 'id'),
+                options['query'],
+                mode
+            )[:VehicleListView.paginate_by]
+
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(qs)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+
+            if connection.vendor == 'postgresql':
+                plan = qs.explain(analyze=True, buffers=True)
+            else:
+                plan = qs.explain()
+            uses_index = '_trgm' in plan
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n[{mode}]'))
+            self.stdout.write(plan)
+            self.stdout.write(
+                f'Медиана: {timings[len(timings) // 2] * 1000:.2f} мс, '
+                f'максимум: {timings[-1] * 1000:.2f} мс'
+            )
+            if uses_index:
+                self.stdout.write(self.style.SUCCESS('Используется триграммный индекс'))
+            else:
+                self.stdout.write(self.style.WARNING('Триграммный индекс не используется'))
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+TRIGRAM_INDEXES = [
+    ('vehicle_brand_upper_trgm', 'brand'),
+    ('vehicle_reg_number_upper_trgm', 'reg_number'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm есть только в PostgreSQL; на других бэкендах поиск работает через icontains
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        # Индекс по UPPER(...) совпадает с SQL, который Django строит для icontains
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} '
+            f'ON vehicle_vehicle USING gin (UPPER({column}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0002_vehicle_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['created_at', 'id'], name='vehicle_alive_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['id'], name='vehicle_alive_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['type'], name='vehicle_alive_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicleimage',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['vehicle'], name='vehicleimage_alive_vehicle_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicletype',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['created_at', 'id'], name='vehicletype_alive_created_idx'),
+        ),
+    ]
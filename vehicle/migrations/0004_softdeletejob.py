@@ -0,0 +1,28 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0003_alive_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SoftDeleteJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'В очереди'), ('RUNNING', 'Выполняется'), ('DONE', 'Завершено'), ('FAILED', 'Ошибка')], default='PENDING', max_length=20, verbose_name='Статус')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Всего техники')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Обработано')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата завершения')),
+                ('vehicle_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='soft_delete_jobs', to='vehicle.vehicletype', verbose_name='Тип техники')),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0004_softdeletejob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['updated_at'], name='vehicle_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicleimage',
+            index=models.Index(fields=['updated_at'], name='vehicleimage_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vehicletype',
+            index=models.Index(fields=['updated_at'], name='vehicletype_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0005_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FleetCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation_status', models.CharField(choices=[('IN_OP', 'В работе'), ('IDLE', 'Простой'), ('REPAIR', 'Ремонт')], max_length=20, verbose_name='Статус')),
+                ('vehicles', models.IntegerField(default=0, verbose_name='Количество техники')),
+                ('mileage_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18, verbose_name='Суммарный пробег')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('vehicle_type', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='vehicle.vehicletype', verbose_name='Тип техники')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='fleetcounter',
+            constraint=models.UniqueConstraint(fields=('vehicle_type', 'operation_status'), name='fleetcounter_type_status_uniq'),
+        ),
+    ]
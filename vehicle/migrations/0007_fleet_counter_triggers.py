@@ -0,0 +1,78 @@
+from django.db import migrations
+
+UPSERT = '''
+        INSERT INTO vehicle_fleetcounter (vehicle_type_id, operation_status, vehicles, mileage_sum, updated_at)
+        SELECT type_id, operation_status, sum(delta), sum(mileage), now()
+        FROM ({rows}) AS deltas
+        GROUP BY type_id, operation_status
+        HAVING sum(delta) <> 0 OR sum(mileage) <> 0
+        ORDER BY type_id, operation_status
+        ON CONFLICT (vehicle_type_id, operation_status) DO UPDATE SET
+            vehicles = vehicle_fleetcounter.vehicles + EXCLUDED.vehicles,
+            mileage_sum = vehicle_fleetcounter.mileage_sum + EXCLUDED.mileage_sum,
+            updated_at = EXCLUDED.updated_at;
+'''
+NEW_ROWS = 'SELECT type_id, operation_status, 1 AS delta, mileage FROM new_rows WHERE NOT is_deleted'
+OLD_ROWS = 'SELECT type_id, operation_status, -1 AS delta, -mileage AS mileage FROM old_rows WHERE NOT is_deleted'
+
+CREATE_SQL = f'''
+CREATE OR REPLACE FUNCTION vehicle_fleet_counters_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {UPSERT.format(rows=NEW_ROWS)}
+    ELSIF TG_OP = 'UPDATE' THEN
+        {UPSERT.format(rows=NEW_ROWS + ' UNION ALL ' + OLD_ROWS)}
+    ELSE
+        {UPSERT.format(rows=OLD_ROWS)}
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER vehicle_fleet_counters_insert AFTER INSERT ON vehicle_vehicle
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION vehicle_fleet_counters_sync();
+CREATE TRIGGER vehicle_fleet_counters_update AFTER UPDATE ON vehicle_vehicle
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION vehicle_fleet_counters_sync();
+CREATE TRIGGER vehicle_fleet_counters_delete AFTER DELETE ON vehicle_vehicle
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION vehicle_fleet_counters_sync();
+
+INSERT INTO vehicle_fleetcounter (vehicle_type_id, operation_status, vehicles, mileage_sum, updated_at)
+SELECT type_id, operation_status, count(*), sum(mileage), now()
+FROM vehicle_vehicle
+WHERE NOT is_deleted
+GROUP BY type_id, operation_status;
+'''
+
+DROP_SQL = '''
+DROP TRIGGER IF EXISTS vehicle_fleet_counters_insert ON vehicle_vehicle;
+DROP TRIGGER IF EXISTS vehicle_fleet_counters_update ON vehicle_vehicle;
+DROP TRIGGER IF EXISTS vehicle_fleet_counters_delete ON vehicle_vehicle;
+DROP FUNCTION IF EXISTS vehicle_fleet_counters_sync();
+DELETE FROM vehicle_fleetcounter;
+'''
+
+
+def create_triggers(apps, schema_editor):
+    # Триггеры с таблицами переходов есть только в PostgreSQL; на других
+    # бэкендах счётчики заполняет команда rebuild_fleet_counters
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0006_fleetcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 4.2.23 on 2026-10-18 10:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0007_fleet_counter_triggers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Attribute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('unit', models.CharField(blank=True, max_length=20, verbose_name='Единица измерения')),
+                ('data_type', models.CharField(choices=[('string', 'string'), ('integer', 'integer'), ('decimal', 'decimal'), ('float', 'float')], default='string', max_length=10, verbose_name='Тип данных')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('is_deleted', models.BooleanField(default=False, verbose_name='Удалён')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SparePartType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название типа')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('is_deleted', models.BooleanField(default=False, verbose_name='Удалён')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('is_deleted', False)), fields=['created_at', 'id'], name='parttype_alive_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SparePart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('INSTALLED', 'Установлено'), ('REMOVED', 'Снято'), ('IN_STOCK', 'На складе')], default='INSTALLED', max_length=20, verbose_name='Статус')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('is_deleted', models.BooleanField(default=False, verbose_name='Удалено')),
+                ('type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='vehicle.spareparttype', verbose_name='Тип запчасти')),
+                ('vehicle', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='spare_parts', to='vehicle.vehicle', verbose_name='Техника')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AttributeValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value_string', models.CharField(blank=True, max_length=255, null=True, verbose_name='Строка')),
+                ('value_integer', models.BigIntegerField(blank=True, null=True, verbose_name='Целое')),
+                ('value_decimal', models.DecimalField(blank=True, decimal_places=4, max_digits=18, null=True, verbose_name='Десятичное')),
+                ('value_float', models.FloatField(blank=True, null=True, verbose_name='Вещественное')),
+                ('attribute', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='values', to='vehicle.attribute', verbose_name='Атрибут')),
+                ('part', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='attribute_values', to='vehicle.sparepart', verbose_name='Запчасть')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='attribute',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['created_at', 'id'], name='attribute_alive_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sparepart',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['created_at', 'id'], name='sparepart_alive_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sparepart',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['type'], name='sparepart_alive_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sparepart',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['vehicle'], name='sparepart_alive_vehicle_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attributevalue',
+            index=models.Index(condition=models.Q(('value_string__isnull', False)), fields=['attribute', 'value_string'], name='attributevalue_string_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attributevalue',
+            index=models.Index(condition=models.Q(('value_integer__isnull', False)), fields=['attribute', 'value_integer'], name='attributevalue_integer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attributevalue',
+            index=models.Index(condition=models.Q(('value_decimal__isnull', False)), fields=['attribute', 'value_decimal'], name='attributevalue_decimal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attributevalue',
+            index=models.Index(condition=models.Q(('value_float__isnull', False)), fields=['attribute', 'value_float'], name='attributevalue_float_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attributevalue',
+            constraint=models.UniqueConstraint(fields=('part', 'attribute'), name='attributevalue_part_attribute_uniq'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.23 on 2026-10-18 11:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+POSTGRES_INDEXES = {
+    # Строки дописываются почти по порядку времени, поэтому BRIN на порядки
+    # меньше B-дерева и отсекает всё вне периода отчёта
+    'vehiclehistory_recorded_brin': (
+        'ON vehicle_vehiclehistory USING brin (recorded_at) WITH (autosummarize = on)'
+    ),
+    # Отчёты о простое читают смены статуса только из индекса, по порядку
+    # (техника, время), в котором их и обходит оконная функция
+    'vehiclehistory_status_idx': (
+        'ON vehicle_vehiclehistory (vehicle_id, recorded_at) INCLUDE (operation_status) '
+        'WHERE operation_status IS NOT NULL'
+    ),
+}
+
+
+def create_postgres_indexes(apps, schema_editor):
+    # BRIN и INCLUDE есть только в PostgreSQL; на других бэкендах хватает vehiclehistory_vehicle_idx
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, definition in POSTGRES_INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} {definition}')
+
+
+def drop_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in POSTGRES_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0008_spare_parts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehicleHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время')),
+                ('operation_status', models.CharField(blank=True, choices=[('IN_OP', 'В работе'), ('IDLE', 'Простой'), ('REPAIR', 'Ремонт')], max_length=20, null=True, verbose_name='Статус')),
+                ('mileage', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Пробег')),
+                ('source', models.CharField(choices=[('EDIT', 'Изменение'), ('TELEMETRY', 'Телеметрия')], default='EDIT', max_length=10, verbose_name='Источник')),
+                ('vehicle', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='history', to='vehicle.vehicle', verbose_name='Техника')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vehicle', 'recorded_at'], name='vehiclehistory_vehicle_idx')],
+            },
+        ),
+        migrations.RunPython(create_postgres_indexes, drop_postgres_indexes),
+    ]
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+CREATE_SQL = '''
+CREATE OR REPLACE FUNCTION vehicle_history_append() RETURNS trigger AS $$
+BEGIN
+    -- Приём телеметрии сам пишет показания и выключает триггер на время своей транзакции
+    IF current_setting('vehicle.skip_history', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO vehicle_vehiclehistory (vehicle_id, recorded_at, operation_status, mileage, source)
+        SELECT id, now(), operation_status, mileage, 'EDIT' FROM new_rows;
+    ELSE
+        INSERT INTO vehicle_vehiclehistory (vehicle_id, recorded_at, operation_status, mileage, source)
+        SELECT n.id, now(),
+               CASE WHEN n.operation_status IS DISTINCT FROM o.operation_status THEN n.operation_status END,
+               CASE WHEN n.mileage IS DISTINCT FROM o.mileage THEN n.mileage END,
+               'EDIT'
+        FROM new_rows n
+        JOIN old_rows o ON o.id = n.id
+        WHERE n.operation_status IS DISTINCT FROM o.operation_status OR n.mileage IS DISTINCT FROM o.mileage;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER vehicle_history_insert AFTER INSERT ON vehicle_vehicle
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION vehicle_history_append();
+CREATE TRIGGER vehicle_history_update AFTER UPDATE ON vehicle_vehicle
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION vehicle_history_append();
+
+INSERT INTO vehicle_vehiclehistory (vehicle_id, recorded_at, operation_status, mileage, source)
+SELECT id, created_at, operation_status, mileage, 'EDIT'
+FROM vehicle_vehicle
+ORDER BY created_at;
+'''
+
+DROP_SQL = '''
+DROP TRIGGER IF EXISTS vehicle_history_insert ON vehicle_vehicle;
+DROP TRIGGER IF EXISTS vehicle_history_update ON vehicle_vehicle;
+DROP FUNCTION IF EXISTS vehicle_history_append();
+DELETE FROM vehicle_vehiclehistory;
+'''
+
+
+def create_triggers(apps, schema_editor):
+    # Как и счётчики парка (0007), история на других бэкендах триггерами не ведётся
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0009_vehiclehistory'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
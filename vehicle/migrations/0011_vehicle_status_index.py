@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-18 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicle', '0010_vehicle_history_triggers'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vehicle',
+            index=models.Index(fields=['operation_status', 'id'], name='vehicle_status_id_idx'),
+        ),
+    ]
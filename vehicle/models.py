@@ -1,4 +1,7 @@
+from decimal import Decimal
+
 from django.db import models
+from django.utils import timezone
 from sorl.thumbnail import ImageField
 
 
@@ -8,12 +11,89 @@ class VehicleStatus(models.TextChoices):
     REPAIR = 'REPAIR', 'Ремонт'
 
 
+class AliveQuerySet(models.QuerySet):
+    def alive(self):
+        return self.filter(is_deleted=False)
+
+
+class AliveManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class VehicleQuerySet(AliveQuerySet):
+    def with_list_data(self):
+        return self.select_related('type')
+
+    def with_detail_data(self):
+        return self.select_related('type').prefetch_related(
+            models.Prefetch(
+                'images',
+                queryset=VehicleImage.alive.order_by('id'),
+                to_attr='alive_images'
+            )
+        )
+
+
+class VehicleImageQuerySet(AliveQuerySet):
+    def with_list_data(self):
+        return self.select_related('vehicle')
+
+
+class SparePartStatus(models.TextChoices):
+    INSTALLED = 'INSTALLED', 'Установлено'
+    REMOVED = 'REMOVED', 'Снято'
+    IN_STOCK = 'IN_STOCK', 'На складе'
+
+
+class AttributeDataType(models.TextChoices):
+    STRING = 'string', 'string'
+    INTEGER = 'integer', 'integer'
+    DECIMAL = 'decimal', 'decimal'
+    FLOAT = 'float', 'float'
+
+
+class SparePartQuerySet(AliveQuerySet):
+    def with_list_data(self):
+        # Значения атрибутов всей страницы приходят одним запросом, сколько бы их ни было
+        return self.select_related('type', 'vehicle').prefetch_related(
+            models.Prefetch(
+                'attribute_values',
+                queryset=AttributeValue.objects.filter(attribute__is_deleted=False)
+                .select_related('attribute').order_by('attribute__name', 'attribute_id'),
+                to_attr='attribute_list'
+            )
+        )
+
+    def filter_attribute(self, attribute, lookup, value):
+        """Запчасти, у которых значение атрибута удовлетворяет lookup (exact, gt, lte...)."""
+        values = AttributeValue.objects.filter(
+            part=models.OuterRef('pk'),
+            attribute=attribute,
+            **{f'{attribute.value_field}__{lookup}': value}
+        )
+        return self.filter(models.Exists(values))
+
+
 class VehicleType(models.Model):
     name = models.CharField(max_length=100, verbose_name='Название типа')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
     is_deleted = models.BooleanField(default=False, verbose_name='Удалён')
 
+    objects = AliveQuerySet.as_manager()
+    alive = AliveManager.from_queryset(AliveQuerySet)()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(is_deleted=False),
+                name='vehicletype_alive_created_idx'
+            ),
+            models.Index(fields=['updated_at'], name='vehicletype_updated_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -34,6 +114,31 @@ class Vehicle(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
     is_deleted = models.BooleanField(default=False, verbose_name='Удалён')
 
+    objects = VehicleQuerySet.as_manager()
+    alive = AliveManager.from_queryset(VehicleQuerySet)()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(is_deleted=False),
+                name='vehicle_alive_created_idx'
+            ),
+            models.Index(
+                fields=['id'],
+                condition=models.Q(is_deleted=False),
+                name='vehicle_alive_id_idx'
+            ),
+            models.Index(
+                fields=['type'],
+                condition=models.Q(is_deleted=False),
+                name='vehicle_alive_type_idx'
+            ),
+            # Фильтр по статусу в админке с сортировкой по -id
+            models.Index(fields=['operation_status', 'id'], name='vehicle_status_id_idx'),
+            models.Index(fields=['updated_at'], name='vehicle_updated_idx'),
+        ]
+
     def __str__(self):
         return f'{self.brand} ({self.reg_number})'
 
@@ -50,5 +155,293 @@ class VehicleImage(models.Model):
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
     is_deleted = models.BooleanField(default=False, verbose_name='Удалён')
 
+    objects = VehicleImageQuerySet.as_manager()
+    alive = AliveManager.from_queryset(VehicleImageQuerySet)()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['vehicle'],
+                condition=models.Q(is_deleted=False),
+                name='vehicleimage_alive_vehicle_idx'
+            ),
+            models.Index(fields=['updated_at'], name='vehicleimage_updated_idx'),
+        ]
+
     def __str__(self):
         return f'Фото для {self.vehicle}'
+
+
+class VehicleHistory(models.Model):
+    """
+    Журнал изменений статуса и пробега техники, только дописывается. Строки правок
+    пишут триггеры на vehicle_vehicle (миграция 0010) для save(), update() и
+    bulk_create, строки телеметрии — TelemetryIngest. operation_status заполнен только
+    при смене статуса, mileage — только при изменении пробега.
+    """
+    class Source(models.TextChoices):
+        EDIT = 'EDIT', 'Изменение'
+        TELEMETRY = 'TELEMETRY', 'Телеметрия'
+
+    # Без внешнего ключа в БД: вставка телеметрии не проверяет каждую строку по vehicle_vehicle
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='history',
+        verbose_name='Техника'
+    )
+    recorded_at = models.DateTimeField(default=timezone.now, verbose_name='Время')
+    operation_status = models.CharField(
+        max_length=20, choices=VehicleStatus.choices, null=True, blank=True, verbose_name='Статус'
+    )
+    mileage = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name='Пробег')
+    source = models.CharField(max_length=10, choices=Source.choices, default=Source.EDIT, verbose_name='Источник')
+
+    class Meta:
+        # BRIN по recorded_at и покрывающий частичный индекс для отчётов о простое
+        # создаются только на PostgreSQL в миграции 0009
+        indexes = [
+            models.Index(fields=['vehicle', 'recorded_at'], name='vehiclehistory_vehicle_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.vehicle_id} {self.recorded_at:%Y-%m-%d %H:%M}: {self.operation_status or self.mileage}'
+
+
+class SoftDeleteJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'В очереди'
+        RUNNING = 'RUNNING', 'Выполняется'
+        DONE = 'DONE', 'Завершено'
+        FAILED = 'FAILED', 'Ошибка'
+
+    vehicle_type = models.ForeignKey(
+        VehicleType,
+        on_delete=models.CASCADE,
+        related_name='soft_delete_jobs',
+        verbose_name='Тип техники'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='Статус'
+    )
+    total = models.PositiveIntegerField(default=0, verbose_name='Всего техники')
+    processed = models.PositiveIntegerField(default=0, verbose_name='Обработано')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата завершения')
+
+    def __str__(self):
+        return f'Удаление {self.vehicle_type}: {self.processed}/{self.total}'
+
+
+class FleetCounter(models.Model):
+    """
+    Материализованные счётчики техники по типу и статусу. На PostgreSQL
+    поддерживаются триггерами на vehicle_vehicle (миграция 0007), поэтому
+    учитывают и save(), и массовые update()/bulk_create; пересчитываются
+    командой rebuild_fleet_counters.
+    """
+    vehicle_type = models.ForeignKey(
+        VehicleType,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Тип техники'
+    )
+    operation_status = models.CharField(max_length=20, choices=VehicleStatus.choices, verbose_name='Статус')
+    vehicles = models.IntegerField(default=0, verbose_name='Количество техники')
+    mileage_sum = models.DecimalField(max_digits=18, decimal_places=2, default=0, verbose_name='Суммарный пробег')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['vehicle_type', 'operation_status'],
+                name='fleetcounter_type_status_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.vehicle_type_id} / {self.operation_status}: {self.vehicles}'
+
+
+class SparePartType(models.Model):
+    name = models.CharField(max_length=100, verbose_name='Название типа')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
+    is_deleted = models.BooleanField(default=False, verbose_name='Удалён')
+
+    objects = AliveQuerySet.as_manager()
+    alive = AliveManager.from_queryset(AliveQuerySet)()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(is_deleted=False),
+                name='parttype_alive_created_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Attribute(models.Model):
+    """
+    Пользовательский атрибут запчасти. Значение хранится в колонке AttributeValue
+    своего типа данных, поэтому сравнения «больше/меньше» выполняются в БД по индексу.
+    """
+    VALUE_FIELDS = {
+        AttributeDataType.STRING: 'value_string',
+        AttributeDataType.INTEGER: 'value_integer',
+        AttributeDataType.DECIMAL: 'value_decimal',
+        AttributeDataType.FLOAT: 'value_float',
+    }
+
+    name = models.CharField(max_length=100, verbose_name='Название')
+    unit = models.CharField(max_length=20, blank=True, verbose_name='Единица измерения')
+    data_type = models.CharField(
+        max_length=10,
+        choices=AttributeDataType.choices,
+        default=AttributeDataType.STRING,
+        verbose_name='Тип данных'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
+    is_deleted = models.BooleanField(default=False, verbose_name='Удалён')
+
+    objects = AliveQuerySet.as_manager()
+    alive = AliveManager.from_queryset(AliveQuerySet)()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(is_deleted=False),
+                name='attribute_alive_created_idx'
+            ),
+        ]
+
+    @property
+    def value_field(self):
+        return self.VALUE_FIELDS[self.data_type]
+
+    @property
+    def label(self):
+        return f'{self.name} ({self.unit})' if self.unit else self.name
+
+    def __str__(self):
+        return self.label
+
+
+class SparePart(models.Model):
+    type = models.ForeignKey(SparePartType, on_delete=models.CASCADE, verbose_name='Тип запчасти')
+    vehicle = models.ForeignKey(
+        Vehicle,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='spare_parts',
+        verbose_name='Техника'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=SparePartStatus.choices,
+        default=SparePartStatus.INSTALLED,
+        verbose_name='Статус'
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
+    is_deleted = models.BooleanField(default=False, verbose_name='Удалено')
+
+    objects = SparePartQuerySet.as_manager()
+    alive = AliveManager.from_queryset(SparePartQuerySet)()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(is_deleted=False),
+                name='sparepart_alive_created_idx'
+            ),
+            models.Index(
+                fields=['type'],
+                condition=models.Q(is_deleted=False),
+                name='sparepart_alive_type_idx'
+            ),
+            models.Index(
+                fields=['vehicle'],
+                condition=models.Q(is_deleted=False),
+                name='sparepart_alive_vehicle_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.type} #{self.pk}'
+
+
+class AttributeValue(models.Model):
+    """
+    Значение атрибута запчасти: заполнена ровно одна колонка value_*, по типу данных
+    атрибута. Частичные индексы (attribute, value_*) обслуживают фильтры по значению.
+    """
+    # Поиск по part обслуживает уникальный индекс (part, attribute)
+    part = models.ForeignKey(
+        SparePart,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='attribute_values',
+        verbose_name='Запчасть'
+    )
+    attribute = models.ForeignKey(
+        Attribute,
+        on_delete=models.CASCADE,
+        related_name='values',
+        verbose_name='Атрибут'
+    )
+    value_string = models.CharField(max_length=255, null=True, blank=True, verbose_name='Строка')
+    value_integer = models.BigIntegerField(null=True, blank=True, verbose_name='Целое')
+    value_decimal = models.DecimalField(
+        max_digits=18, decimal_places=4, null=True, blank=True, verbose_name='Десятичное'
+    )
+    value_float = models.FloatField(null=True, blank=True, verbose_name='Вещественное')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['part', 'attribute'], name='attributevalue_part_attribute_uniq'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['attribute', field],
+                condition=models.Q(**{f'{field}__isnull': False}),
+                name=f'attributevalue_{field[6:]}_idx'
+            )
+            for field in Attribute.VALUE_FIELDS.values()
+        ]
+
+    @property
+    def value(self):
+        return getattr(self, self.attribute.value_field)
+
+    @value.setter
+    def value(self, value):
+        for field in Attribute.VALUE_FIELDS.values():
+            setattr(self, field, None)
+        setattr(self, self.attribute.value_field, value)
+
+    @property
+    def display_value(self):
+        # DecimalField хранит 4 знака после запятой; 50.5000 показываем как 50.5
+        if isinstance(self.value, Decimal):
+            return f'{self.value.normalize():f}'
+        return self.value
+
+    def __str__(self):
+        return f'{self.attribute}: {self.display_value}'
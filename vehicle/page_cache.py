@@ -0,0 +1,111 @@
+import hashlib
+import time
+from functools import partial
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from .instrumentation import timed
+
+GENERATION_KEY = 'vehicle:page-generation'
+CSRF_PLACEHOLDER = '__vehicle_page_cache_csrf_token__'
+
+
+def get_generation(key=GENERATION_KEY):
+    # Поколение хранится в общем кэше default (Redis в production), чтобы запись
+    # в одном воркере сразу сбрасывала страницы во всех
+    generation = cache.get(key)
+    if generation is None:
+        # После вытеснения счётчик начинается с текущего времени, а не с 1,
+        # чтобы не совпасть с поколением уже закэшированных страниц
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(key=GENERATION_KEY):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(key=GENERATION_KEY):
+    """
+    Сбрасывает кэш страниц списков. Поколение увеличивается сразу и ещё раз после
+    фиксации транзакции: иначе читатель, успевший до COMMIT, положил бы старые
+    данные под новое поколение. Нужен везде, где запись идёт мимо сигналов
+    (update(), bulk_create()).
+    """
+    bump_generation(key)
+    transaction.on_commit(partial(bump_generation, key))
+
+
+class PageCacheMixin:
+    """
+    Кэширует отрендеренную страницу ListView в кэше pages по параметрам
+    page_cache_params и поколению данных. CSRF-токен в HTML заменяется
+    заглушкой и подставляется для каждого запроса.
+    """
+    page_cache_params = ('page', 'brand', 'search', 'mode', 'cursor')
+
+    def page_cache_enabled(self):
+        return settings.VEHICLE_PAGE_CACHE_TIMEOUT > 0
+
+    def get_page_cache_key(self):
+        params = [
+            (name, value)
+            for name in self.page_cache_params
+            for value in self.request.GET.getlist(name)
+        ]
+        digest = hashlib.md5(urlencode(params).encode()).hexdigest()
+        return f'vehicle-page:{get_generation()}:{self.template_name}:{digest}'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.page_cache_enabled():
+            context['csrf_token'] = CSRF_PLACEHOLDER
+        return context
+
+    def get(self, request, *args, **kwargs):
+        if not self.page_cache_enabled():
+            return super().get(request, *args, **kwargs)
+        key = self.get_page_cache_key()
+        cached = caches['pages'].get(key)
+        if cached is not None:
+            return self.cached_response(*cached, cache_status='hit')
+        response = super().get(request, *args, **kwargs)
+        # Ответ рендерится здесь, до process_template_response, поэтому время
+        # рендеринга учитывается явно; попадание в кэш рендеринга не требует
+        timed('render', response.render)
+        return self.store(key, response)
+
+    def store(self, key, response):
+        entry = (response.content, response['Content-Type'])
+        if response.status_code == 200:
+            caches['pages'].set(key, entry, settings.VEHICLE_PAGE_CACHE_TIMEOUT)
+        return self.cached_response(*entry, cache_status='miss', status=response.status_code)
+
+    def cached_response(self, content, content_type, cache_status, status=200):
+        content = content.replace(CSRF_PLACEHOLDER.encode(), get_token(self.request).encode())
+        response = HttpResponse(content, content_type=content_type, status=status)
+        response['X-Page-Cache'] = cache_status
+        return response
+
+
+class AsyncPageCacheMixin(PageCacheMixin):
+    async def get(self, request, *args, **kwargs):
+        if not self.page_cache_enabled():
+            return await super().get(request, *args, **kwargs)
+        key = await sync_to_async(self.get_page_cache_key)()
+        cached = await caches['pages'].aget(key)
+        if cached is not None:
+            return self.cached_response(*cached, cache_status='hit')
+        response = await super().get(request, *args, **kwargs)
+        await sync_to_async(timed)('render', response.render)
+        return await sync_to_async(self.store)(key, response)
@@ -0,0 +1,198 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+def encode_cursor(direction, created_at, pk):
+    raw = f'{direction}|{created_at.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, created_at, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise Http404('Некорректный курсор')
+    if direction not in (FORWARD, BACKWARD) or created_at is None:
+        raise Http404('Некорректный курсор')
+    return direction, created_at, pk
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset-пагинация по (created_at, id): без COUNT(*) и OFFSET,
+    стоимость страницы не зависит от её номера.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, token=None):
+        direction, created_at, qs = self.window(token)
+        return self.build_page(direction, created_at, list(qs))
+
+    async def apage(self, token=None):
+        direction, created_at, qs = self.window(token)
+        return self.build_page(direction, created_at, [row async for row in qs.aiterator()])
+
+    def window(self, token):
+        direction, created_at, pk = decode_cursor(token) if token else (FORWARD, None, None)
+        qs = self.queryset
+
+        if direction == FORWARD:
+            if created_at is not None:
+                qs = qs.filter(created_at__gte=created_at).filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+                )
+            qs = qs.order_by('created_at', 'pk')
+        else:
+            qs = qs.filter(created_at__lte=created_at).filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+            )
+            qs = qs.order_by('-created_at', '-pk')
+        return direction, created_at, qs[:self.per_page + 1]
+
+    def build_page(self, direction, created_at, rows):
+        has_more = len(rows) > self.per_page
+        if direction == FORWARD:
+            rows = rows[:self.per_page]
+            has_next, has_previous = has_more, created_at is not None
+        else:
+            rows = rows[:self.per_page][::-1]
+            has_next, has_previous = True, has_more
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(FORWARD, *self.position(rows[-1]))
+        if rows and has_previous:
+            previous_cursor = encode_cursor(BACKWARD, *self.position(rows[0]))
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+    @staticmethod
+    def position(row):
+        # Строки могут быть моделями или словарями из .values() с created_at и id
+        if isinstance(row, dict):
+            return row['created_at'], row['id']
+        return row.created_at, row.pk
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator для админки больших таблиц: строки считаются точно лишь до
+    VEHICLE_ADMIN_EXACT_COUNT_LIMIT, дальше число берётся из оценки планировщика
+    PostgreSQL (EXPLAIN) вместо полного COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.VEHICLE_ADMIN_EXACT_COUNT_LIMIT
+        if connections[queryset.db].vendor != 'postgresql':
+            return super().count
+        # COUNT(*) по подзапросу с LIMIT останавливается на limit + 1 строке
+        exact = queryset.order_by()[:limit + 1].count()
+        if exact <= limit:
+            return exact
+        return max(self.estimate(queryset), exact)
+
+    @staticmethod
+    def estimate(queryset):
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CursorPaginationMixin:
+    """
+    Включает курсорную пагинацию для ListView через ?mode=cursor
+    или глобально настройкой VEHICLE_PAGINATION_MODE = 'cursor'.
+    """
+    cursor_kwarg = 'cursor'
+
+    def get_pagination_mode(self):
+        mode = self.request.GET.get('mode')
+        if mode in ('offset', 'cursor'):
+            return mode
+        return getattr(settings, 'VEHICLE_PAGINATION_MODE', 'offset')
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.get_pagination_mode() != 'cursor':
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['cursor_mode'] = self.get_pagination_mode() == 'cursor'
+        return context
+
+
+class AsyncPaginationMixin(CursorPaginationMixin):
+    """
+    Пагинация для async-представлений: страница выбирается через acount()/aiterator()
+    до построения контекста, а paginate_queryset лишь возвращает готовый результат,
+    чтобы get_context_data ListView не обращался к БД из event loop.
+    """
+
+    async def apaginate_queryset(self, queryset, page_size):
+        if self.get_pagination_mode() == 'cursor':
+            paginator = CursorPaginator(queryset, page_size)
+            page = await paginator.apage(self.request.GET.get(self.cursor_kwarg))
+            return paginator, page, page.object_list, page.has_other_pages()
+
+        paginator = self.get_paginator(queryset, page_size, allow_empty_first_page=self.get_allow_empty())
+        # count — cached_property, подставляем значение, посчитанное асинхронно
+        paginator.count = await queryset.acount()
+        page_number = self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg) or 1
+        try:
+            page_number = paginator.num_pages if page_number == 'last' else int(page_number)
+            page = paginator.page(page_number)
+        except (ValueError, InvalidPage):
+            raise Http404('Некорректный номер страницы')
+        page.object_list = [obj async for obj in page.object_list.aiterator()]
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def paginate_queryset(self, queryset, page_size):
+        return self._async_page
@@ -0,0 +1,57 @@
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections, models
+from django.db.models import Q
+from django.db.models.functions import Greatest, Upper
+
+
+class SearchMode(models.TextChoices):
+    BRAND = 'brand', 'По бренду'
+    ANY = 'any', 'По бренду или номеру'
+    SIMILAR = 'similar', 'Похожие'
+
+
+_trigram_cache = {}
+
+
+def trigram_available(using='default'):
+    """
+    Поиск по триграммам возможен только на PostgreSQL с установленным pg_trgm,
+    на остальных бэкендах (SQLite в тестах) используется обычный icontains.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    if using not in _trigram_cache:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_cache[using] = cursor.fetchone() is not None
+    return _trigram_cache[using]
+
+
+def search_vehicles(queryset, query, mode=SearchMode.BRAND):
+    """
+    Фильтрует технику по строке поиска. Выражения UPPER(...) LIKE совпадают
+    с функциональными GIN-индексами из миграции 0002, поэтому на PostgreSQL
+    поиск идёт по индексу, а не полным сканированием таблицы.
+    """
+    query = (query or '').strip()
+    if not query:
+        return queryset
+
+    if mode == SearchMode.SIMILAR and trigram_available(queryset.db):
+        term = query.upper()
+        return queryset.annotate(
+            brand_upper=Upper('brand'),
+            reg_number_upper=Upper('reg_number'),
+        ).filter(
+            Q(brand_upper__trigram_similar=term) | Q(reg_number_upper__trigram_similar=term)
+        ).annotate(
+            similarity=Greatest(
+                TrigramSimilarity('brand_upper', term),
+                TrigramSimilarity('reg_number_upper', term),
+            )
+        ).order_by('-similarity', 'created_at', 'id')
+
+    if mode == SearchMode.BRAND:
+        return queryset.filter(brand__icontains=query)
+    return queryset.filter(Q(brand__icontains=query) | Q(reg_number__icontains=query))
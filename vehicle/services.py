@@ -0,0 +1,213 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import images, page_cache, thumbnails
+from .models import Attribute, AttributeValue, SoftDeleteJob, SparePart, Vehicle, VehicleImage
+
+
+def save_vehicle(form, uploads=(), delete_ids=()):
+    """
+    Сохраняет технику и её фото одной транзакцией. Файлы уже проверены формой,
+    нормализуются и пишутся в хранилище параллельно до начала транзакции; строки
+    VehicleImage вставляются одним bulk_create, отмеченные фото удаляются одним
+    update(). Если транзакция не прошла, файлы остаются: имя по хэшу содержимого
+    мог уже переиспользовать параллельный запрос, а лишний файл просто достанется
+    следующей загрузке того же фото.
+    """
+    names, created = store_image_files(uploads)
+    with transaction.atomic():
+        vehicle = form.save()
+        now = timezone.now()
+        VehicleImage.objects.bulk_create(
+            [VehicleImage(vehicle=vehicle, file=name) for name in names]
+        )
+        if delete_ids:
+            VehicleImage.alive.filter(vehicle=vehicle, pk__in=delete_ids).update(
+                is_deleted=True, updated_at=now
+            )
+        if names or delete_ids:
+            Vehicle.objects.filter(pk=vehicle.pk).update(updated_at=now)
+        # bulk_create и update() идут мимо сигналов
+        page_cache.invalidate()
+        # У уже хранившихся фото миниатюры есть
+        if created and settings.VEHICLE_THUMBNAIL_PREGENERATE:
+            transaction.on_commit(lambda: thumbnails.submit(created))
+    return vehicle
+
+
+def store_image_files(uploads):
+    """Возвращает имена файлов в порядке загрузки и список впервые записанных из них."""
+    uploads = list(uploads)
+    if not uploads:
+        return [], []
+
+    with ThreadPoolExecutor(min(settings.VEHICLE_UPLOAD_WORKERS, len(uploads))) as executor:
+        futures = [executor.submit(images.store, upload) for upload in uploads]
+
+    errors = [future.exception() for future in futures if future.exception()]
+    if errors:
+        raise errors[0]
+    results = [future.result() for future in futures]
+    created = list(dict.fromkeys(name for name, is_new in results if is_new))
+    return [name for name, _ in results], created
+
+
+def soft_delete_vehicle(vehicle):
+    now = timezone.now()
+    with transaction.atomic():
+        Vehicle.objects.filter(pk=vehicle.pk).update(is_deleted=True, updated_at=now)
+        VehicleImage.alive.filter(vehicle=vehicle).update(is_deleted=True, updated_at=now)
+        page_cache.invalidate()
+    vehicle.is_deleted = True
+    vehicle.updated_at = now
+
+
+def soft_delete_vehicle_type(vehicle_type, background=None):
+    """
+    Тип помечается удалённым сразу, а технику и фото каскад удаляет пачками
+    по SOFT_DELETE_BATCH_SIZE записей в отдельных коротких транзакциях,
+    чтобы не держать блокировки на весь каскад. Прогресс пишется в SoftDeleteJob.
+    """
+    if background is None:
+        background = settings.SOFT_DELETE_IN_BACKGROUND
+
+    with transaction.atomic():
+        vehicle_type.is_deleted = True
+        vehicle_type.save(update_fields=['is_deleted', 'updated_at'])
+        job = SoftDeleteJob.objects.create(
+            vehicle_type=vehicle_type,
+            total=Vehicle.alive.filter(type=vehicle_type).count()
+        )
+
+    if background:
+        thread = threading.Thread(target=_run_in_thread, args=(job.pk,), daemon=True)
+        transaction.on_commit(thread.start)
+    else:
+        run_soft_delete_job(job)
+    return job
+
+
+def run_soft_delete_job(job, batch_size=None):
+    batch_size = batch_size or settings.SOFT_DELETE_BATCH_SIZE
+    SoftDeleteJob.objects.filter(pk=job.pk).update(status=SoftDeleteJob.Status.RUNNING, updated_at=timezone.now())
+    try:
+        while process_soft_delete_batch(job, batch_size):
+            pass
+    except Exception as exc:
+        SoftDeleteJob.objects.filter(pk=job.pk).update(
+            status=SoftDeleteJob.Status.FAILED,
+            error=str(exc),
+            updated_at=timezone.now()
+        )
+        raise
+
+    job.status = SoftDeleteJob.Status.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    return job
+
+
+def process_soft_delete_batch(job, batch_size):
+    """Удаляет одну пачку техники типа вместе с фото; возвращает её размер."""
+    now = timezone.now()
+    with transaction.atomic():
+        # Без ORDER BY пачка берётся прямо из частичного индекса по type без сортировки
+        ids = list(
+            Vehicle.alive.filter(type_id=job.vehicle_type_id)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        VehicleImage.alive.filter(vehicle_id__in=ids).update(is_deleted=True, updated_at=now)
+        Vehicle.objects.filter(id__in=ids).update(is_deleted=True, updated_at=now)
+        page_cache.invalidate()
+        job.processed += len(ids)
+        job.save(update_fields=['processed', 'updated_at'])
+    return len(ids)
+
+
+def claim_soft_delete_jobs(stale_after=None):
+    """
+    Забирает незавершённые задания каскада для run_soft_delete_jobs: с ошибкой и те,
+    чей прогресс (updated_at обновляет каждая пачка) не двигался stale_after секунд,
+    например брошенные перезапущенным воркером. Задание забирается условным update(),
+    поэтому два одновременных запуска команды не берут одно и то же.
+    """
+    if stale_after is None:
+        stale_after = settings.SOFT_DELETE_STALE_AFTER
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    candidates = SoftDeleteJob.objects.filter(
+        Q(status=SoftDeleteJob.Status.FAILED)
+        | Q(status__in=[SoftDeleteJob.Status.PENDING, SoftDeleteJob.Status.RUNNING], updated_at__lt=cutoff)
+    ).order_by('id')
+    claimed = []
+    for job in candidates:
+        if SoftDeleteJob.objects.filter(pk=job.pk, status=job.status, updated_at=job.updated_at).update(
+            status=SoftDeleteJob.Status.RUNNING, updated_at=timezone.now()
+        ):
+            claimed.append(job)
+    return claimed
+
+
+def _run_in_thread(job_pk):
+    try:
+        run_soft_delete_job(SoftDeleteJob.objects.get(pk=job_pk))
+    finally:
+        connections.close_all()
+
+
+def save_spare_part(form):
+    """
+    Сохраняет запчасть и значения её атрибутов одной транзакцией за постоянное
+    число запросов: заполненные значения вставляются или обновляются одним
+    INSERT ... ON CONFLICT, очищенные удаляются одним DELETE.
+    """
+    with transaction.atomic():
+        part = form.save()
+        values, cleared = [], []
+        for attribute, value in form.attribute_values().items():
+            if value in (None, ''):
+                cleared.append(attribute.pk)
+                continue
+            item = AttributeValue(part=part, attribute=attribute)
+            item.value = value
+            values.append(item)
+        if values:
+            AttributeValue.objects.bulk_create(
+                values,
+                update_conflicts=True,
+                unique_fields=['part', 'attribute'],
+                update_fields=list(Attribute.VALUE_FIELDS.values())
+            )
+        if cleared:
+            AttributeValue.objects.filter(part=part, attribute_id__in=cleared).delete()
+    return part
+
+
+def soft_delete_spare_part_type(part_type):
+    now = timezone.now()
+    with transaction.atomic():
+        part_type.is_deleted = True
+        part_type.save(update_fields=['is_deleted', 'updated_at'])
+        SparePart.alive.filter(type=part_type).update(is_deleted=True, updated_at=now)
+
+
+def soft_delete_spare_part(part):
+    now = timezone.now()
+    SparePart.objects.filter(pk=part.pk).update(is_deleted=True, updated_at=now)
+    part.is_deleted = True
+    part.updated_at = now
+
+
+def soft_delete_attribute(attribute):
+    # Значения остаются в БД, но скрываются из карточек и формы запчасти
+    now = timezone.now()
+    Attribute.objects.filter(pk=attribute.pk).update(is_deleted=True, updated_at=now)
+    attribute.is_deleted = True
+    attribute.updated_at = now
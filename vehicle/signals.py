@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import page_cache, thumbnails
+from .choices import invalidate_vehicle_type_choices
+from .models import Vehicle, VehicleImage, VehicleType
+
+
+@receiver(post_save, sender=VehicleImage)
+def pregenerate_thumbnails(sender, instance, created, raw=False, **kwargs):
+    if raw or not created or not instance.file or not settings.VEHICLE_THUMBNAIL_PREGENERATE:
+        return
+    file_name = instance.file.name
+    transaction.on_commit(lambda: thumbnails.submit([file_name]))
+
+
+@receiver(post_save, sender=VehicleImage)
+@receiver(post_delete, sender=VehicleImage)
+def touch_vehicle(sender, instance, raw=False, **kwargs):
+    # updated_at техники входит в ключ кэша фрагмента с фото
+    if not raw:
+        Vehicle.objects.filter(pk=instance.vehicle_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_save, sender=VehicleType)
+@receiver(post_save, sender=VehicleImage)
+@receiver(post_delete, sender=Vehicle)
+@receiver(post_delete, sender=VehicleType)
+@receiver(post_delete, sender=VehicleImage)
+def invalidate_page_cache(sender, raw=False, **kwargs):
+    if not raw:
+        page_cache.invalidate()
+
+
+@receiver(post_save, sender=VehicleType)
+@receiver(post_delete, sender=VehicleType)
+def invalidate_type_choices(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_vehicle_type_choices()
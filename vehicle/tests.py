@@ -1,3 +1,1190 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.forms.models import modelformset_factory
+from django.http import Http404
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import images
+from .aggregates import check_counters
+from .choices import invalidate_vehicle_type_choices
+from .fleet import FleetGenerator
+from .forms import VehicleForm, VehicleImageFormSet, VehicleTypeChoiceField
+from .history import TelemetryIngest
+from .models import Attribute, AttributeDataType, AttributeValue, SparePart, SparePartType
+from .models import FleetCounter, SoftDeleteJob, Vehicle, VehicleHistory, VehicleImage, VehicleStatus, VehicleType
+from .page_cache import CSRF_PLACEHOLDER
+from .pagination import CursorPaginator, EstimatedCountPaginator
+from .search import SearchMode, search_vehicles, trigram_available
+from .services import save_vehicle, soft_delete_vehicle, soft_delete_vehicle_type
+from .transfer import VehicleImporter
+from .views import AsyncVehicleDetailView, AsyncVehicleListView, AsyncVehicleTypeListView
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Планы запросов проверяются только на PostgreSQL')
+class AlivePartialIndexPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        types = VehicleType.objects.bulk_create(
+            [VehicleType(name=f'Тип {i}', is_deleted=i % 5 == 0) for i in range(50)]
+        )
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(
+                reg_number=f'A{i:05d}',
+                brand='УРАЛ',
+                date_purchase=date(2024, 1, 1),
+                type=types[i % len(types)],
+                mileage=i,
+                is_deleted=i % 10 == 0,
+            )
+            for i in range(5000)
+        ])
+        VehicleImage.objects.bulk_create([
+            VehicleImage(file=f'vehicle_images/{i}.jpg', vehicle=vehicles[i % len(vehicles)], is_deleted=i % 7 == 0)
+            for i in range(5000)
+        ])
+        cls.vehicle = vehicles[1]
+        cls.vehicle_type = types[1]
+        with connection.cursor() as cursor:
+            for model in (VehicleType, Vehicle, VehicleImage):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+    def assertUsesIndex(self, queryset, *index_names):
+        # Без seq scan планировщик обязан выбрать индекс; если подходящего нет,
+        # в плане всё равно останется Seq Scan, и тест упадёт.
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan)
+        self.assertTrue(any(name in plan for name in index_names), plan)
+
+    def test_vehicle_list_by_created_at(self):
+        qs = Vehicle.objects.filter(is_deleted=False).order_by('created_at', 'id')[:10]
+        self.assertUsesIndex(qs, 'vehicle_alive_created_idx')
+
+    def test_vehicle_list_by_id(self):
+        qs = Vehicle.objects.filter(is_deleted=False).order_by('id')[:10]
+        self.assertUsesIndex(qs, 'vehicle_alive_id_idx')
+
+    def test_vehicles_by_type(self):
+        qs = Vehicle.objects.filter(type=self.vehicle_type, is_deleted=False)
+        # Обычный индекс внешнего ключа тоже подходит, важно отсутствие seq scan
+        self.assertUsesIndex(qs, 'vehicle_alive_type_idx', 'vehicle_vehicle_type_id')
+
+    def test_images_by_vehicle(self):
+        qs = VehicleImage.objects.filter(vehicle=self.vehicle, is_deleted=False)
+        self.assertUsesIndex(qs, 'vehicleimage_alive_vehicle_idx', 'vehicle_vehicleimage_vehicle_id')
+
+    def test_vehicle_type_list(self):
+        qs = VehicleType.objects.filter(is_deleted=False).order_by('created_at', 'id')[:10]
+        self.assertUsesIndex(qs, 'vehicletype_alive_created_idx')
+
+
+@override_settings(VEHICLE_PAGE_CACHE_TIMEOUT=0)
+class QueryCountTests(TestCase):
+    """Число запросов на страницу не должно зависеть от количества строк."""
+
+    def create_vehicles(self, count, images_per_vehicle=0):
+        vehicle_types = VehicleType.objects.bulk_create(
+            [VehicleType(name=f'Тип {i}') for i in range(count)]
+        )
+        vehicles = Vehicle.objects.bulk_create([
+            Vehicle(
+                reg_number=f'A{i:05d}',
+                brand='УРАЛ',
+                date_purchase=date(2024, 1, 1),
+                type=vehicle_types[i],
+                mileage=i,
+            )
+            for i in range(count)
+        ])
+        # Пустой файл шаблон пропускает, поэтому запросы sorl.thumbnail не попадают в счётчик
+        VehicleImage.objects.bulk_create([
+            VehicleImage(file='', vehicle=vehicle)
+            for vehicle in vehicles
+            for i in range(images_per_vehicle)
+        ])
+        return vehicles
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_vehicle_list_query_count_is_constant(self):
+        self.create_vehicles(2)
+        small = self.count_queries(reverse('vehicle:vehicle_list'))
+        self.create_vehicles(30)
+        self.assertEqual(self.count_queries(reverse('vehicle:vehicle_list')), small)
+        self.assertEqual(self.count_queries(reverse('vehicle:vehicle_list') + '?page=2'), small)
+
+    def test_vehicle_list_cursor_mode_skips_count(self):
+        self.create_vehicles(30)
+        offset = self.count_queries(reverse('vehicle:vehicle_list'))
+        cursor = self.count_queries(reverse('vehicle:vehicle_list') + '?mode=cursor')
+        self.assertEqual(cursor, offset - 1)
+
+    def test_vehicle_type_list_query_count_is_constant(self):
+        self.create_vehicles(2)
+        small = self.count_queries(reverse('vehicle:vehicletype_list'))
+        self.create_vehicles(30)
+        self.assertEqual(self.count_queries(reverse('vehicle:vehicletype_list')), small)
+
+    def test_vehicle_detail_query_count_is_constant(self):
+        few = self.create_vehicles(1, images_per_vehicle=1)[0]
+        many = self.create_vehicles(1, images_per_vehicle=8)[0]
+        self.assertEqual(
+            self.count_queries(reverse('vehicle:vehicle_detail', args=[few.pk])),
+            self.count_queries(reverse('vehicle:vehicle_detail', args=[many.pk]))
+        )
+
+
+@override_settings(VEHICLE_PAGE_CACHE_TIMEOUT=0)
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        vehicle_type = VehicleType.objects.create(name='Самосвал')
+        Vehicle.objects.bulk_create([
+            Vehicle(reg_number=f'A{i:03d}', brand='УРАЛ', date_purchase=date(2024, 1, 1), type=vehicle_type, mileage=i)
+            for i in range(13)
+        ])
+        # Одинаковое время создания: порядок держится только на id
+        Vehicle.objects.update(created_at=datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+        self.ids = list(Vehicle.objects.order_by('id').values_list('id', flat=True))
+
+    def test_pages_cover_all_rows_forward_and_back(self):
+        paginator = CursorPaginator(Vehicle.alive.all(), 3)
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([vehicle.pk for page in pages for vehicle in page], self.ids)
+        self.assertFalse(pages[0].has_previous())
+
+        previous = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual([vehicle.pk for vehicle in previous], [vehicle.pk for vehicle in pages[-2]])
+        self.assertTrue(previous.has_next())
+
+    def test_list_view_cursor_param(self):
+        url = reverse('vehicle:vehicle_list')
+        first = self.client.get(url, {'mode': 'cursor'}).context['page_obj']
+        second = self.client.get(url, {'mode': 'cursor', 'cursor': first.next_cursor}).context['vehicles']
+        self.assertEqual([vehicle.pk for vehicle in second], self.ids[len(first):])
+        self.assertEqual(self.client.get(url, {'mode': 'cursor', 'cursor': 'не курсор'}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'mode': 'cursor', 'cursor': 'eHx5fHo'}).status_code, 404)
+
+
+@override_settings(VEHICLE_PAGE_CACHE_TIMEOUT=0)
+class VehicleSearchTests(TestCase):
+    def setUp(self):
+        vehicle_type = VehicleType.objects.create(name='Самосвал')
+        for reg_number, brand in [('A001', 'Volvo FH'), ('B002', 'Scania'), ('C003', 'Volvo')]:
+            Vehicle.objects.create(
+                reg_number=reg_number, brand=brand, date_purchase=date(2024, 1, 1), type=vehicle_type, mileage=1
+            )
+
+    def search(self, query, mode):
+        return list(search_vehicles(Vehicle.objects.order_by('created_at', 'id'), query, mode).values_list(
+            'reg_number', flat=True
+        ))
+
+    def test_brand_and_any_modes(self):
+        self.assertEqual(self.search('volvo', SearchMode.BRAND), ['A001', 'C003'])
+        self.assertEqual(self.search('b00', SearchMode.BRAND), [])
+        self.assertEqual(self.search('b00', SearchMode.ANY), ['B002'])
+        self.assertEqual(self.search('  ', SearchMode.ANY), ['A001', 'B002', 'C003'])
+
+    def test_similar_falls_back_to_icontains_without_trigrams(self):
+        with mock.patch('vehicle.search.trigram_available', return_value=False):
+            self.assertEqual(self.search('scan', SearchMode.SIMILAR), ['B002'])
+            self.assertEqual(self.search('Scnia', SearchMode.SIMILAR), [])
+
+    def test_similar_is_ranked(self):
+        if not trigram_available():
+            self.skipTest('Нет расширения pg_trgm')
+        self.assertEqual(self.search('VOLVO', SearchMode.SIMILAR), ['C003', 'A001'])
+
+    def test_similar_list_uses_offset_pagination(self):
+        params = {'brand': 'volvo', 'search': 'similar', 'mode': 'cursor'}
+        response = self.client.get(reverse('vehicle:vehicle_list'), params)
+        self.assertFalse(response.context['cursor_mode'])
+        self.assertEqual(response.context['paginator'].count, 2)
+        self.assertTrue(self.client.get(reverse('vehicle:vehicle_list'), {'mode': 'cursor'}).context['cursor_mode'])
+
+        response = self.client.get(reverse('vehicle:api_vehicle_list'), params)
+        self.assertEqual(response.status_code, 400)
+
+
+class SoftDeleteTests(TestCase):
+    def setUp(self):
+        self.vehicle_type = VehicleType.objects.create(name='Самосвал')
+        self.other_type = VehicleType.objects.create(name='Трактор')
+        self.vehicles = Vehicle.objects.bulk_create([
+            Vehicle(
+                reg_number=f'A{i:03d}',
+                brand='БЕЛАЗ',
+                date_purchase=date(2024, 1, 1),
+                type=self.other_type if i == 0 else self.vehicle_type,
+                mileage=i,
+            )
+            for i in range(8)
+        ])
+        VehicleImage.objects.bulk_create(
+            [VehicleImage(file='', vehicle=vehicle) for vehicle in self.vehicles]
+        )
+
+    def test_vehicle_type_cascade_runs_in_batches(self):
+        with self.settings(SOFT_DELETE_BATCH_SIZE=3):
+            job = soft_delete_vehicle_type(self.vehicle_type, background=False)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, SoftDeleteJob.Status.DONE)
+        self.assertEqual((job.total, job.processed), (7, 7))
+        self.assertIsNotNone(job.finished_at)
+        self.assertFalse(Vehicle.alive.filter(type=self.vehicle_type).exists())
+        self.assertFalse(VehicleImage.alive.filter(vehicle__type=self.vehicle_type).exists())
+        self.assertTrue(Vehicle.alive.filter(type=self.other_type).exists())
+        self.assertTrue(VehicleImage.alive.filter(vehicle__type=self.other_type).exists())
+
+    def test_command_reclaims_only_abandoned_jobs(self):
+        abandoned = SoftDeleteJob.objects.create(
+            vehicle_type=self.vehicle_type, status=SoftDeleteJob.Status.RUNNING, total=7
+        )
+        SoftDeleteJob.objects.filter(pk=abandoned.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        # Задание живого воркера только что записало прогресс
+        running = SoftDeleteJob.objects.create(vehicle_type=self.other_type, status=SoftDeleteJob.Status.RUNNING)
+
+        call_command('run_soft_delete_jobs', '--stale-after', '60', stdout=io.StringIO())
+
+        abandoned.refresh_from_db()
+        running.refresh_from_db()
+        self.assertEqual((abandoned.status, abandoned.processed), (SoftDeleteJob.Status.DONE, 7))
+        self.assertEqual(running.status, SoftDeleteJob.Status.RUNNING)
+        self.assertTrue(Vehicle.alive.filter(type=self.other_type).exists())
+
+    def test_delete_views(self):
+        vehicle = self.vehicles[0]
+        self.client.post(reverse('vehicle:vehicle_delete', args=[vehicle.pk]))
+        self.assertFalse(Vehicle.alive.filter(pk=vehicle.pk).exists())
+        self.assertFalse(VehicleImage.alive.filter(vehicle=vehicle).exists())
+
+        self.client.post(reverse('vehicle:vehicletype_delete', args=[self.vehicle_type.pk]))
+        self.assertFalse(VehicleType.alive.filter(pk=self.vehicle_type.pk).exists())
+        self.assertEqual(Vehicle.alive.count(), 0)
+
+
+class VehicleTransferTests(TestCase):
+    def setUp(self):
+        self.vehicle_type = VehicleType.objects.create(name='Самосвал')
+
+    def test_import_csv_validates_rows_and_inserts_in_batches(self):
+        content = (
+            'reg_number,brand,date_purchase,type,mileage,operation_status\n'
+            'A001,УРАЛ,2024-01-01,Самосвал,10.5,IN_OP\n'
+            'A002,КАМАЗ,not-a-date,Самосвал,1,IDLE\n'
+            'A003,КАМАЗ,2024-01-02,Самосвал,1,REPAIR\n'
+            'A004,КАМАЗ,2024-01-02,Экскаватор,1,IDLE\n'
+        ).encode()
+        with self.settings(VEHICLE_IMPORT_BATCH_SIZE=1):
+            response = self.client.post(reverse('vehicle:vehicle_import'), {
+                'file': SimpleUploadedFile('fleet.csv', content, content_type='text/csv'),
+            })
+
+        report = response.json()
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([error['line'] for error in report['errors']], [2, 4])
+        self.assertEqual(
+            list(Vehicle.objects.order_by('reg_number').values_list('reg_number', 'type__name')),
+            [('A001', 'Самосвал'), ('A003', 'Самосвал')]
+        )
+
+    def test_export_jsonl_round_trips_through_import(self):
+        Vehicle.objects.create(
+            reg_number='B001', brand='БЕЛАЗ', date_purchase=date(2023, 5, 1),
+            type=self.vehicle_type, mileage='120.50'
+        )
+        response = self.client.get(reverse('vehicle:vehicle_export'), {'format': 'jsonl'})
+        content = b''.join(response.streaming_content)
+        self.assertEqual(json.loads(content)['type'], 'Самосвал')
+
+        Vehicle.objects.all().delete()
+        response = self.client.post(reverse('vehicle:vehicle_import'), {
+            'file': SimpleUploadedFile('fleet.jsonl', content),
+        })
+        self.assertEqual(response.json(), {'created': 1, 'errors': []})
+        self.assertEqual(Vehicle.objects.get().mileage, Decimal('120.50'))
+
+    def test_import_creates_types_only_for_valid_rows(self):
+        row = {'reg_number': 'C001', 'brand': 'МАЗ', 'date_purchase': '2024-01-01', 'mileage': 1,
+               'operation_status': 'IN_OP'}
+        rows = [{**row, 'date_purchase': 'вчера', 'type': 'Грейдер'}, {**row, 'type': 5}]
+        self.assertEqual(VehicleImporter().run(rows).errors[1]['errors']['type'], ['Неизвестный тип техники: 5'])
+
+        importer = VehicleImporter(create_types=True).run(rows)
+        self.assertEqual([error['line'] for error in importer.errors], [1])
+        self.assertEqual(list(VehicleType.objects.order_by('name').values_list('name', flat=True)), ['5', 'Самосвал'])
+
+
+class ThumbnailPregenerationTests(TestCase):
+    def test_new_image_schedules_pregeneration_after_commit(self):
+        vehicle_type = VehicleType.objects.create(name='Самосвал')
+        vehicle = Vehicle.objects.create(
+            reg_number='A001', brand='УРАЛ', date_purchase=date(2024, 1, 1), type=vehicle_type, mileage=0
+        )
+        with mock.patch('vehicle.thumbnails.submit') as submit:
+            with self.captureOnCommitCallbacks(execute=True):
+                image = VehicleImage.objects.create(vehicle=vehicle, file='vehicle_images/a.jpg')
+                submit.assert_not_called()
+            image.save()
+        submit.assert_called_once_with(['vehicle_images/a.jpg'])
+
+
+def make_photo(name='photo.jpg'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (60, 40), 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class DetailFragmentCacheTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root, VEHICLE_THUMBNAIL_PREGENERATE=False)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        cache.clear()
+
+        vehicle_type = VehicleType.objects.create(name='Самосвал')
+        self.vehicle = Vehicle.objects.create(
+            reg_number='A001', brand='УРАЛ', date_purchase=date(2024, 1, 1), type=vehicle_type, mileage=0
+        )
+        self.images = [VehicleImage.objects.create(vehicle=self.vehicle, file=make_photo()) for _ in range(3)]
+        self.url = reverse('vehicle:vehicle_detail', args=[self.vehicle.pk])
+
+    def get_thumbnail_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        queries = [q['sql'] for q in context.captured_queries if 'thumbnail_kvstore' in q['sql']]
+        return response, queries
+
+    def test_hot_detail_page_skips_thumbnail_kvstore(self):
+        self.get_thumbnail_queries()
+        response, queries = self.get_thumbnail_queries()
+        self.assertEqual(queries, [])
+        self.assertContains(response, '<img src=', count=3)
+
+    def test_image_soft_delete_invalidates_fragment(self):
+        self.client.get(self.url)
+        image = self.images[0]
+        image.is_deleted = True
+        image.save()
+        self.assertContains(self.client.get(self.url), '<img src=', count=2)
+
+        soft_delete_vehicle(self.vehicle)
+        self.assertNotContains(self.client.get(self.url), '<img src=')
+
+
+class VehicleImageUploadTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root, VEHICLE_THUMBNAIL_PREGENERATE=False)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.vehicle_type = VehicleType.objects.create(name='Самосвал')
+
+    def vehicle_data(self, **extra):
+        data = {
+            'reg_number': 'A001', 'brand': 'УРАЛ', 'date_purchase': '2024-01-01',
+            'type': self.vehicle_type.pk, 'mileage': '10', 'operation_status': 'IN_OP',
+        }
+        data.update(extra)
+        return data
+
+    def test_create_saves_all_uploaded_images(self):
+        photos = [make_photo(f'{i}.jpg') for i in range(5)]
+        response = self.client.post(reverse('vehicle:vehicle_create'), self.vehicle_data(images=photos))
+        self.assertRedirects(response, reverse('vehicle:vehicle_list'))
+        vehicle = Vehicle.objects.get()
+        self.assertEqual(vehicle.images.count(), 5)
+
+    def test_invalid_image_rolls_back_vehicle(self):
+        broken = SimpleUploadedFile('broken.jpg', b'not an image', content_type='image/jpeg')
+        response = self.client.post(
+            reverse('vehicle:vehicle_create'), self.vehicle_data(images=[make_photo(), broken])
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Vehicle.objects.exists())
+
+    def test_upload_limit_is_configurable(self):
+        with self.settings(VEHICLE_MAX_IMAGES_PER_UPLOAD=2):
+            response = self.client.post(
+                reverse('vehicle:vehicle_create'),
+                self.vehicle_data(images=[make_photo(f'{i}.jpg') for i in range(3)])
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Vehicle.objects.exists())
+
+    def test_update_deletes_flagged_and_adds_new_images(self):
+        vehicle = Vehicle.objects.create(
+            reg_number='A001', brand='УРАЛ', date_purchase=date(2024, 1, 1), type=self.vehicle_type, mileage=0
+        )
+        old = [VehicleImage.objects.create(vehicle=vehicle, file=make_photo()) for _ in range(2)]
+        data = self.vehicle_data(**{
+            'brand': 'КАМАЗ',
+            'images-TOTAL_FORMS': '2', 'images-INITIAL_FORMS': '2',
+            'images-0-id': old[0].pk, 'images-0-vehicle': vehicle.pk, 'images-0-DELETE': 'on',
+            'images-1-id': old[1].pk, 'images-1-vehicle': vehicle.pk,
+            'images': [make_photo('new.jpg')],
+        })
+        response = self.client.post(reverse('vehicle:vehicle_update', args=[vehicle.pk]), data)
+        self.assertRedirects(response, reverse('vehicle:vehicle_list'))
+
+        vehicle.refresh_from_db()
+        self.assertEqual(vehicle.brand, 'КАМАЗ')
+        self.assertEqual(VehicleImage.alive.filter(vehicle=vehicle).count(), 2)
+        self.assertFalse(VehicleImage.alive.filter(pk=old[0].pk).exists())
+
+    @override_settings(VEHICLE_IMAGE_MAX_SIZE=100, VEHICLE_IMAGE_FORMAT='webp')
+    def test_uploads_are_normalized_and_deduplicated(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # повёрнуто на 90°
+        exif[0x010F] = 'Phone'
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), 'blue').save(buffer, 'JPEG', exif=exif)
+        for reg_number in ('A001', 'A002'):
+            photo = SimpleUploadedFile('phone.jpg', buffer.getvalue(), content_type='image/jpeg')
+            self.client.post(
+                reverse('vehicle:vehicle_create'), self.vehicle_data(reg_number=reg_number, images=[photo])
+            )
+
+        names = set(VehicleImage.objects.values_list('file', flat=True))
+        self.assertEqual(VehicleImage.objects.count(), 2)
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertRegex(name, images.CONTENT_NAME_REGEX + 'webp$')
+        storage = images.storage()
+        self.assertEqual(len(storage.listdir(os.path.dirname(name))[1]), 1)
+        with storage.open(name) as file, Image.open(file) as stored:
+            self.assertEqual((stored.format, stored.size), ('WEBP', (75, 100)))
+            self.assertEqual(dict(stored.getexif()), {})
+
+    def test_failed_save_keeps_previously_stored_files(self):
+        name, _ = images.store(make_photo())
+        form = VehicleForm(self.vehicle_data())
+        self.assertTrue(form.is_valid())
+        with mock.patch.object(form, 'save', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                save_vehicle(form, [make_photo(), make_photo('other.jpg')])
+        self.assertTrue(images.storage().exists(name))
+
+    def test_concurrent_store_reuses_file(self):
+        # Оба запроса не застали файл и пишут его одновременно
+        with mock.patch.object(FileSystemStorage, 'exists', return_value=False):
+            first = images.store(make_photo())
+            second = images.store(make_photo('copy.jpg'))
+        self.assertTrue(first[1])
+        self.assertEqual(second, (first[0], False))
+        directory = os.path.dirname(images.storage().path(first[0]))
+        self.assertEqual(os.listdir(directory), [os.path.basename(first[0])])
+
+    def test_oversized_image_is_form_error(self):
+        # 60 × 40 = 2400 пикселей: больше лимита, но меньше порога DecompressionBombError
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 2000), self.assertWarns(Image.DecompressionBombWarning):
+            response = self.client.post(
+                reverse('vehicle:vehicle_create'), self.vehicle_data(images=[make_photo()])
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Vehicle.objects.exists())
+
+    def test_normalize_images_command_skips_decompression_bombs(self):
+        vehicle = Vehicle.objects.create(
+            reg_number='A001', brand='УРАЛ', date_purchase=date(2024, 1, 1), type=self.vehicle_type, mileage=0
+        )
+        legacy = VehicleImage.objects.create(vehicle=vehicle, file=make_photo())
+        stderr = io.StringIO()
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000):
+            call_command('normalize_images', stdout=io.StringIO(), stderr=stderr)
+        self.assertIn(legacy.file.name, stderr.getvalue())
+        legacy.refresh_from_db()
+        self.assertNotRegex(legacy.file.name, images.CONTENT_NAME_REGEX)
+
+    def test_normalize_images_command_merges_legacy_files(self):
+        vehicle = Vehicle.objects.create(
+            reg_number='A001', brand='УРАЛ', date_purchase=date(2024, 1, 1), type=self.vehicle_type, mileage=0
+        )
+        legacy = [VehicleImage.objects.create(vehicle=vehicle, file=make_photo()) for _ in range(2)]
+        call_command('normalize_images', '--delete-originals', stdout=io.StringIO())
+        names = set(VehicleImage.objects.values_list('file', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertRegex(names.pop(), images.CONTENT_NAME_REGEX)
+        self.assertFalse(images.storage().exists(legacy[0].file.name))
+
+
+@override_settings(VEHICLE_THUMBNAIL_PREGENERATE=False)
+class VehicleUpdateFormsetTests(TestCase):
+    def setUp(self):
+        self.vehicle_type = VehicleType.objects.create(name='Самосвал')
+        self.vehicle = Vehicle.objects.create(
+            reg_number='A001', brand='УРАЛ', date_purchase=date(2024, 1, 1), type=self.vehicle_type, mileage=0
+        )
+        VehicleImage.objects.bulk_create([VehicleImage(vehicle=self.vehicle, file='') for _ in range(3)])
+
+    def post_data(self):
+        images = list(VehicleImage.alive.filter(vehicle=self.vehicle).order_by('id'))
+        data = {
+            'reg_number': 'A001', 'brand': 'УРАЛ', 'date_purchase': '2024-01-01',
+            'type': self.vehicle_type.pk, 'mileage': '10', 'operation_status': 'IN_OP',
+            'images-TOTAL_FORMS': len(images), 'images-INITIAL_FORMS': len(images),
+            # Не изображение: форма загрузки не проходит, и страница рендерится заново
+            'images': SimpleUploadedFile('notes.jpg', b'not an image'),
+        }
+        for i, image in enumerate(images):
+            data[f'images-{i}-id'] = image.pk
+            data[f'images-{i}-vehicle'] = self.vehicle.pk
+        return data
+
+    def test_rerender_builds_and_binds_formset_once(self):
+        # Фабрика формсетов для модели строит класс через modelformset_factory
+        with mock.patch('django.forms.models.modelformset_factory', wraps=modelformset_factory) as factory, \
+                mock.patch.object(VehicleImageFormSet, '__init__', autospec=True,
+                                  side_effect=VehicleImageFormSet.__init__) as bind:
+            response = self.client.post(reverse('vehicle:vehicle_update', args=[self.vehicle.pk]), self.post_data())
+        self.assertEqual(response.status_code, 200)
+        # Прежний вид строил класс формсета в каждом get_context_data и при повторном
+        # рендеринге формы заново связывал его с POST
+        self.assertEqual(factory.call_count, 0)
+        self.assertEqual(bind.call_count, 1)
+
+
+class VehicleApiTests(TestCase):
+    def setUp(self):
+        self.vehicle_type = VehicleType.objects.create(name='Самосвал')
+        self.vehicles = [
+            Vehicle.objects.create(
+                reg_number=f'A{i:03d}', brand='УРАЛ' if i % 2 else 'КАМАЗ',
+                date_purchase=date(2024, 1, 1), type=self.vehicle_type, mileage=i
+            )
+            for i in range(5)
+        ]
+        self.url = reverse('vehicle:api_vehicle_list')
+
+    def test_cursor_pagination_walks_all_rows(self):
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get(self.url, params).json()
+            seen += [row['reg_number'] for row in data['results']]
+            cursor = data['next']
+            if not cursor:
+                break
+        self.assertEqual(seen, [vehicle.reg_number for vehicle in self.vehicles])
+        self.assertEqual(data['results'][0]['type_name'], 'Самосвал')
+
+    def test_brand_filter(self):
+        data = self.client.get(self.url, {'brand': 'УРАЛ'}).json()
+        self.assertEqual([row['reg_number'] for row in data['results']], ['A001', 'A003'])
+
+    def test_unchanged_poll_returns_304_without_selecting_rows(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(any('"vehicle_vehicle"."reg_number"' in q['sql'] for q in context.captured_queries))
+
+        soft_delete_vehicle(self.vehicles[0])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 4)
+
+    def test_hard_delete_changes_etag(self):
+        response = self.client.get(self.url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        # max(updated_at) не меняется, если удалена не самая свежая запись
+        self.vehicles[0].delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Last-Modified'], last_modified)
+        self.assertEqual(len(response.json()['results']), 4)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_detail_includes_alive_images(self):
+        vehicle = self.vehicles[0]
+        VehicleImage.objects.create(vehicle=vehicle, file='vehicle_images/a.jpg')
+        VehicleImage.objects.create(vehicle=vehicle, file='vehicle_images/b.jpg', is_deleted=True)
+        data = self.client.get(reverse('vehicle:api_vehicle_detail', args=[vehicle.pk])).json()
+        self.assertEqual([image['url'] for image in data['images']], ['/media/vehicle_images/a.jpg'])
+        self.assertEqual(self.client.get(reverse('vehicle:api_vehicle_detail', args=[0])).status_code, 404)
+
+
+@override_settings(VEHICLE_PAGE_CACHE_TIMEOUT=0)
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.vehicle_type = VehicleType.objects.create(name='Самосвал')
+        self.vehicles = [
+            Vehicle.objects.create(
+                reg_number=f'A{i:03d}', brand='УРАЛ' if i % 2 else 'КАМАЗ',
+                date_purchase=date(2024, 1, 1), type=self.vehicle_type, mileage=i
+            )
+            for i in range(12)
+        ]
+
+    async def get(self, view_class, path, **kwargs):
+        response = await view_class.as_view()(self.factory.get(path), **kwargs)
+        await sync_to_async(response.render)()
+        return response
+
+    async def test_vehicle_list_offset_pages(self):
+        response = await self.get(AsyncVehicleListView, '/?page=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context_data['paginator'].count, 12)
+        self.assertEqual(
+            [vehicle.reg_number for vehicle in response.context_data['vehicles']], ['A010', 'A011']
+        )
+        with self.assertRaises(Http404):
+            await self.get(AsyncVehicleListView, '/?page=9')
+
+    async def test_vehicle_list_cursor_and_filter(self):
+        response = await self.get(AsyncVehicleListView, '/?mode=cursor&brand=УРАЛ')
+        page = response.context_data['page_obj']
+        self.assertEqual([vehicle.reg_number for vehicle in page], ['A001', 'A003', 'A005', 'A007', 'A009', 'A011'])
+        self.assertFalse(page.has_next())
+        self.assertContains(response, 'Самосвал')
+
+    async def test_vehicle_detail_skips_deleted_images(self):
+        vehicle = self.vehicles[0]
+        kept = await VehicleImage.objects.acreate(file='', vehicle=vehicle)
+        await VehicleImage.objects.acreate(file='', vehicle=vehicle, is_deleted=True)
+        response = await self.get(AsyncVehicleDetailView, '/', pk=vehicle.pk)
+        self.assertEqual([image.pk for image in response.context_data['images']], [kept.pk])
+        with self.assertRaises(Http404):
+            await self.get(AsyncVehicleDetailView, '/', pk=0)
+
+    async def test_vehicle_type_list(self):
+        await sync_to_async(soft_delete_vehicle_type)(
+            await VehicleType.objects.acreate(name='Удалённый'), background=False
+        )
+        response = await self.get(AsyncVehicleTypeListView, '/')
+        self.assertEqual([vehicle_type.name for vehicle_type in response.context_data['types']], ['Самосвал'])
+
+
+@override_settings(VEHICLE_SERVER_TIMING=True, VEHICLE_THUMBNAIL_PREGENERATE=False)
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root, VEHICLE_PROFILE_DIR=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.media_root = media_root
+        cache.clear()
+
+        vehicle_type = VehicleType.objects.create(name='Самосвал')
+        self.vehicle = Vehicle.objects.create(
+            reg_number='A001', brand='УРАЛ', date_purchase=date(2024, 1, 1), type=vehicle_type, mileage=0
+        )
+
+    def server_timing(self, response):
+        return dict(
+            (part.split(';')[0].strip(), part) for part in response['Server-Timing'].split(',')
+        )
+
+    def test_server_timing_reports_sql_render_and_thumbnails(self):
+        VehicleImage.objects.create(vehicle=self.vehicle, file=make_photo())
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('vehicle:vehicle_detail', args=[self.vehicle.pk]))
+        timing = self.server_timing(response)
+        self.assertIn('total', timing)
+        self.assertIn(f'desc="{len(context.captured_queries)}"', timing['sql'])
+        self.assertIn('render', timing)
+        self.assertIn('desc="1"', timing['thumbnail'])
+
+    @override_settings(VEHICLE_PAGE_CACHE_TIMEOUT=60)
+    def test_server_timing_reports_render_of_cached_pages(self):
+        caches['pages'].clear()
+        url = reverse('vehicle:vehicle_list')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertIn('desc="1"', self.server_timing(response)['render'])
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertNotIn('render', self.server_timing(response))
+
+    def test_metrics_endpoint_aggregates_by_view(self):
+        self.client.get(reverse('vehicle:vehicle_list'))
+        body = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('vehicle_http_requests_total{view="vehicle:vehicle_list",method="GET",status="200"}', body)
+        self.assertIn('vehicle_sql_total{view="vehicle:vehicle_list"}', body)
+        self.assertIn('vehicle_http_request_duration_seconds_bucket{view="vehicle:vehicle_list",le="+Inf"}', body)
+
+    @override_settings(VEHICLE_METRICS_TOKEN='secret')
+    def test_metrics_endpoint_requires_private_address_or_token(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='203.0.113.5').status_code, 404)
+        self.assertEqual(
+            self.client.get(url, REMOTE_ADDR='203.0.113.5', HTTP_AUTHORIZATION='Bearer wrong').status_code, 404
+        )
+        self.assertEqual(
+            self.client.get(url, REMOTE_ADDR='203.0.113.5', HTTP_AUTHORIZATION='Bearer secret').status_code, 200
+        )
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.1.2.3').status_code, 200)
+
+    @override_settings(VEHICLE_PROFILE_TOKEN='secret')
+    def test_profile_is_taken_only_with_token(self):
+        url = reverse('vehicle:vehicle_list')
+        self.client.get(url, HTTP_X_PROFILE='wrong')
+        self.assertEqual(list(Path(self.media_root).glob('*.prof')), [])
+        self.client.get(url, HTTP_X_PROFILE='secret')
+        self.assertEqual(len(list(Path(self.media_root).glob('*.prof'))), 1)
+
+
+class FleetGeneratorTests(TestCase):
+    def test_same_seed_gives_same_fleet(self):
+        def snapshot(seed):
+            fleet = FleetGenerator(seed=seed).run(3, 200, 300)
+            rows = list(
+                Vehicle.objects.filter(type__in=fleet.types).order_by('id')
+                .values_list('reg_number', 'brand', 'mileage', 'operation_status', 'is_deleted')
+            )
+            return fleet, rows
+
+        first, first_rows = snapshot(1)
+        second, second_rows = snapshot(1)
+        self.assertEqual(first_rows, second_rows)
+        self.assertEqual(len({row[0] for row in first_rows}), 200)
+        self.assertEqual((first.vehicles, first.images), (200, 300))
+        self.assertEqual(VehicleImage.objects.filter(vehicle__type__in=second.types).count(), 300)
+
+    def test_types_follow_zipf_distribution(self):
+        fleet = FleetGenerator(deleted_ratio=0).run(5, 1000, 0)
+        counts = [Vehicle.alive.filter(type=vehicle_type).count() for vehicle_type in fleet.types]
+        self.assertEqual(sum(counts), 1000)
+        self.assertGreater(counts[0], counts[-1] * 2)
+
+
+class PageCacheTests(TestCase):
+    def setUp(self):
+        caches['pages'].clear()
+        self.vehicle_type = VehicleType.objects.create(name='Самосвал')
+        self.vehicle = Vehicle.objects.create(
+            reg_number='A001', brand='УРАЛ', date_purchase=date(2024, 1, 1), type=self.vehicle_type, mileage=0
+        )
+        self.url = reverse('vehicle:vehicle_list')
+
+    def get(self, url=None, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url or self.url, params)
+        return response, len(context.captured_queries)
+
+    def test_repeated_get_is_served_from_cache(self):
+        first, _ = self.get()
+        second, queries = self.get()
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(queries, 0)
+        self.assertEqual(self.get(brand='урал')[0]['X-Page-Cache'], 'miss')
+        self.assertEqual(self.get(brand='урал', utm='x')[0]['X-Page-Cache'], 'hit')
+
+    def test_cached_page_gets_fresh_csrf_token(self):
+        self.get()
+        response, _ = self.get()
+        self.assertNotContains(response, CSRF_PLACEHOLDER)
+        self.assertContains(response, 'name="csrfmiddlewaretoken"')
+        self.assertIn('csrftoken', response.cookies)
+
+    def test_writes_invalidate_pages(self):
+        self.get()
+        type_list = reverse('vehicle:vehicletype_list')
+        self.get(type_list)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            soft_delete_vehicle(self.vehicle)
+        response, _ = self.get()
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertNotContains(response, 'A001')
+
+        self.get(type_list)
+        with self.captureOnCommitCallbacks(execute=True):
+            soft_delete_vehicle_type(self.vehicle_type, background=False)
+        response, _ = self.get(type_list)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertNotContains(response, 'Самосвал')
+
+    def test_bulk_import_invalidates_pages(self):
+        self.get()
+        rows = [{'reg_number': 'B002', 'brand': 'КАМАЗ', 'date_purchase': '2024-01-01',
+                 'type': 'Самосвал', 'mileage': '5', 'operation_status': 'IN_OP'}]
+        with self.captureOnCommitCallbacks(execute=True):
+            VehicleImporter().run(rows)
+        self.assertContains(self.get()[0], 'B002')
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Счётчики поддерживаются триггерами PostgreSQL')
+class FleetCounterTests(TestCase):
+    def setUp(self):
+        self.dumpers = VehicleType.objects.create(name='Самосвал')
+        self.tractors = VehicleType.objects.create(name='Трактор')
+        self.vehicles = Vehicle.objects.bulk_create([
+            Vehicle(
+                reg_number=f'A{i:03d}', brand='УРАЛ', date_purchase=date(2024, 1, 1),
+                type=self.dumpers if i < 4 else self.tractors, mileage=100 * (i + 1)
+            )
+            for i in range(6)
+        ])
+
+    def test_counters_follow_saves_bulk_updates_and_soft_deletes(self):
+        vehicle = self.vehicles[0]
+        vehicle.operation_status = VehicleStatus.REPAIR
+        vehicle.mileage = 150
+        vehicle.save()
+        Vehicle.objects.filter(type=self.tractors).update(operation_status=VehicleStatus.IDLE)
+        soft_delete_vehicle(self.vehicles[1])
+        soft_delete_vehicle_type(self.tractors, background=False)
+        Vehicle.objects.filter(pk=self.vehicles[2].pk).delete()
+
+        self.assertEqual(check_counters(), {})
+        counter = FleetCounter.objects.get(vehicle_type=self.dumpers, operation_status=VehicleStatus.REPAIR)
+        self.assertEqual((counter.vehicles, counter.mileage_sum), (1, Decimal('150')))
+
+    def test_fleet_status_endpoint(self):
+        data = self.client.get(reverse('vehicle:api_fleet_status')).json()
+        self.assertEqual(data['total'], {'vehicles': 6, 'mileage_sum': '2100.00', 'mileage_avg': '350.00'})
+        self.assertEqual(
+            [(row['type_name'], row['vehicles']) for row in data['by_type']],
+            [('Самосвал', 4), ('Трактор', 2)]
+        )
+        self.assertEqual(data['by_status'][0]['vehicles'], 6)
+
+    def test_rebuild_command_repairs_drift(self):
+        FleetCounter.objects.update(vehicles=0)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_fleet_counters', '--check', stdout=io.StringIO())
+        call_command('rebuild_fleet_counters', stdout=io.StringIO())
+        self.assertEqual(check_counters(), {})
+
+
+class VehicleTypeChoicesTests(TestCase):
+    def setUp(self):
+        self.dumpers = VehicleType.objects.create(name='Самосвал')
+        self.tractors = VehicleType.objects.create(name='Трактор')
+        self.data = {
+            'reg_number': 'A001', 'brand': 'УРАЛ', 'date_purchase': '2024-01-01',
+            'type': self.tractors.pk, 'mileage': '10', 'operation_status': VehicleStatus.IN_OPERATION,
+        }
+
+    def test_warm_form_does_not_query_types(self):
+        VehicleForm().as_p()
+        with CaptureQueriesContext(connection) as context:
+            html = VehicleForm().as_p()
+            form = VehicleForm(self.data)
+            self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(context.captured_queries, [])
+        self.assertIn('class="form-select"', html)
+        self.assertEqual(form.cleaned_data['type'].pk, self.tractors.pk)
+        vehicle = form.save()
+        self.assertEqual(Vehicle.objects.get(pk=vehicle.pk).type, self.tractors)
+
+    def test_type_changes_invalidate_choices(self):
+        VehicleForm().as_p()
+        with self.captureOnCommitCallbacks(execute=True):
+            loaders = VehicleType.objects.create(name='Погрузчик')
+            soft_delete_vehicle_type(self.tractors, background=False)
+        choices = dict(VehicleForm().fields['type'].choices)
+        self.assertIn(loaders.pk, choices)
+        self.assertNotIn(self.tractors.pk, choices)
+        self.assertIn('type', VehicleForm(self.data).errors)
+
+    def test_type_deleted_during_validation_is_form_error(self):
+        VehicleForm().as_p()
+        VehicleType.objects.filter(pk=self.tractors.pk).update(is_deleted=True)
+        form = VehicleForm(self.data)
+        # Значение проверено по старому списку, а версия сменилась до приведения к типу
+        with mock.patch.object(
+            VehicleTypeChoiceField, 'validate', side_effect=lambda value: invalidate_vehicle_type_choices()
+        ):
+            self.assertFalse(form.is_valid())
+        self.assertIn('type', form.errors)
+
+
+class SparePartTests(TestCase):
+    def setUp(self):
+        self.filters = SparePartType.objects.create(name='Фильтр')
+        self.diameter = Attribute.objects.create(name='Диаметр', unit='мм', data_type=AttributeDataType.DECIMAL)
+        self.weight = Attribute.objects.create(name='Вес', unit='кг', data_type=AttributeDataType.FLOAT)
+        self.material = Attribute.objects.create(name='Материал', data_type=AttributeDataType.STRING)
+        vehicle_type = VehicleType.objects.create(name='Самосвал')
+        self.vehicle = Vehicle.objects.create(
+            reg_number='A001', brand='УРАЛ', date_purchase=date(2024, 1, 1), type=vehicle_type, mileage=0
+        )
+
+    def create_parts(self, count):
+        for i in range(count):
+            part = SparePart.objects.create(type=self.filters, vehicle=self.vehicle)
+            AttributeValue.objects.bulk_create([
+                AttributeValue(part=part, attribute=self.diameter, value_decimal=Decimal(10 * (i + 1))),
+                AttributeValue(part=part, attribute=self.weight, value_float=i + 0.5),
+                AttributeValue(part=part, attribute=self.material, value_string='сталь'),
+            ])
+
+    def list_queries(self, **params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('vehicle:sparepart_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_form_saves_typed_values(self):
+        url = reverse('vehicle:sparepart_create')
+        data = {
+            'type': self.filters.pk, 'vehicle': self.vehicle.pk, 'status': 'INSTALLED',
+            f'attribute_{self.diameter.pk}': '50.5', f'attribute_{self.weight.pk}': '3.2',
+        }
+        self.assertRedirects(self.client.post(url, data), reverse('vehicle:sparepart_list'))
+        part = SparePart.objects.get()
+        diameter = AttributeValue.objects.get(part=part, attribute=self.diameter)
+        self.assertEqual((diameter.value_decimal, diameter.value_string), (Decimal('50.5'), None))
+
+        data.update({f'attribute_{self.diameter.pk}': '60', f'attribute_{self.weight.pk}': ''})
+        self.client.post(reverse('vehicle:sparepart_update', args=[part.pk]), data)
+        self.assertEqual(
+            {item.attribute_id: item.value for item in AttributeValue.objects.select_related('attribute')},
+            {self.diameter.pk: Decimal('60')}
+        )
+
+    def test_list_loads_attributes_in_constant_queries(self):
+        self.create_parts(2)
+        _, few = self.list_queries()
+        self.create_parts(8)
+        response, many = self.list_queries()
+        self.assertEqual(few, many)
+        self.assertContains(response, 'Диаметр (мм): 80<br>')
+
+    def test_filter_by_attribute_value(self):
+        self.create_parts(5)
+        response, _ = self.list_queries(attribute=self.diameter.pk, lookup='gt', value='30')
+        self.assertEqual(
+            [part.attribute_list[1].value for part in response.context['parts']],
+            [Decimal(40), Decimal(50)]
+        )
+        response, _ = self.list_queries(attribute=self.diameter.pk, lookup='gt', value='много')
+        self.assertEqual(len(response.context['parts']), 5)
+        self.assertTrue(response.context['filter_form'].errors)
+
+    def test_data_type_is_locked_once_values_exist(self):
+        self.create_parts(1)
+        response = self.client.post(
+            reverse('vehicle:attribute_update', args=[self.diameter.pk]),
+            {'name': 'Диаметр', 'unit': 'мм', 'data_type': 'string'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.diameter.refresh_from_db()
+        self.assertEqual(self.diameter.data_type, AttributeDataType.DECIMAL)
+
+    def test_delete_views_soft_delete(self):
+        self.create_parts(1)
+        part = SparePart.objects.get()
+        self.client.post(reverse('vehicle:sparepart_delete', args=[part.pk]))
+        self.client.post(reverse('vehicle:attribute_delete', args=[self.weight.pk]))
+        self.assertEqual(self.client.get(reverse('vehicle:sparepart_detail', args=[part.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('vehicle:sparepart_update', args=[part.pk])).status_code, 404)
+        self.assertEqual(AttributeValue.objects.filter(part=part).count(), 3)
+        self.assertEqual(list(Attribute.alive.order_by('name')), [self.diameter, self.material])
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Журнал ведут триггеры PostgreSQL')
+class VehicleHistoryTests(TestCase):
+    def setUp(self):
+        self.vehicle_type = VehicleType.objects.create(name='Самосвал')
+        self.vehicle = Vehicle.objects.create(
+            reg_number='A001', brand='УРАЛ', date_purchase=date(2024, 1, 1), type=self.vehicle_type, mileage=100
+        )
+
+    def history(self):
+        return list(
+            VehicleHistory.objects.filter(vehicle=self.vehicle).order_by('id')
+            .values_list('operation_status', 'mileage', 'source')
+        )
+
+    def test_changes_are_appended_by_triggers(self):
+        self.vehicle.operation_status = VehicleStatus.REPAIR
+        self.vehicle.save()
+        self.vehicle.save()
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(mileage=150)
+        self.assertEqual(self.history(), [
+            (VehicleStatus.IN_OPERATION, Decimal('100'), 'EDIT'),
+            (VehicleStatus.REPAIR, None, 'EDIT'),
+            (None, Decimal('150'), 'EDIT'),
+        ])
+
+    def test_telemetry_ingest(self):
+        ingest = TelemetryIngest(batch_size=2).run([
+            {'vehicle': self.vehicle.pk, 'recorded_at': '2025-01-02T10:00:00Z', 'mileage': '180'},
+            {'vehicle': self.vehicle.pk, 'recorded_at': '2025-01-01T10:00:00Z', 'mileage': '170'},
+            {'vehicle': self.vehicle.pk, 'recorded_at': 'вчера', 'mileage': '1'},
+            {'vehicle': 10 ** 9, 'recorded_at': '2025-01-02T10:00:00Z', 'mileage': '1'},
+            {'vehicle': self.vehicle.pk, 'recorded_at': '2025-01-03T10:00:00Z', 'mileage': '90'},
+        ])
+        self.assertEqual(ingest.created, 3)
+        self.assertEqual([error['line'] for error in ingest.errors], [3, 4])
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.mileage, Decimal('180'))
+        self.assertEqual([row[2] for row in self.history()], ['EDIT', 'TELEMETRY', 'TELEMETRY', 'TELEMETRY'])
+
+    @override_settings(VEHICLE_TELEMETRY_TOKEN='secret')
+    def test_telemetry_endpoint_requires_token(self):
+        url = reverse('vehicle:api_telemetry')
+        body = json.dumps({'vehicle': self.vehicle.pk, 'recorded_at': '2025-01-02T10:00:00Z', 'mileage': '200'})
+        self.assertEqual(self.client.post(url, body, content_type='application/x-ndjson').status_code, 403)
+        response = self.client.post(
+            url, body, content_type='application/x-ndjson', headers={'X-Telemetry-Token': 'secret'}
+        )
+        self.assertEqual(response.json(), {'created': 1, 'errors': []})
+
+    def test_downtime_report(self):
+        VehicleHistory.objects.bulk_create([
+            VehicleHistory(vehicle=self.vehicle, recorded_at=datetime(*moment, tzinfo=dt_timezone.utc),
+                           operation_status=status)
+            for moment, status in [
+                ((2024, 12, 30), VehicleStatus.REPAIR),
+                ((2025, 1, 3), VehicleStatus.IN_OPERATION),
+                ((2025, 1, 5), VehicleStatus.IDLE),
+                ((2025, 1, 6), VehicleStatus.IN_OPERATION),
+            ]
+        ] + [
+            VehicleHistory(vehicle=self.vehicle, recorded_at=datetime(2025, 1, day, tzinfo=dt_timezone.utc),
+                           mileage=100 + day * 10, source=VehicleHistory.Source.TELEMETRY)
+            for day in range(1, 10)
+        ])
+        period = {'start': '2025-01-01', 'end': '2025-01-11'}
+        data = self.client.get(reverse('vehicle:api_vehicle_history', args=[self.vehicle.pk]), period).json()
+        self.assertEqual(data['downtime_hours'], {'IDLE': 24.0, 'REPAIR': 48.0})
+        self.assertEqual(data['mileage']['growth'], '80.00')
+
+        data = self.client.get(reverse('vehicle:api_fleet_downtime'), period).json()
+        self.assertEqual(data['by_status']['REPAIR'], {'hours': 48.0, 'vehicles': 1})
+        self.assertEqual(data['by_type'], [{'type_id': self.vehicle_type.pk, 'IDLE': 24.0, 'REPAIR': 48.0}])
+
+        Vehicle.objects.filter(pk=self.vehicle.pk).update(operation_status=VehicleStatus.REPAIR)
+        future = {'start': '2999-01-01', 'end': '2999-02-01'}
+        data = self.client.get(reverse('vehicle:api_vehicle_history', args=[self.vehicle.pk]), future).json()
+        self.assertEqual(data['downtime_hours'], {'IDLE': 0.0, 'REPAIR': 0.0})
+
+
+@mock.patch('vehicle.history.journal_available', return_value=False)
+class VehicleHistoryFallbackTests(TestCase):
+    def setUp(self):
+        self.vehicle = Vehicle.objects.create(
+            reg_number='A001', brand='УРАЛ', date_purchase=date(2024, 1, 1),
+            type=VehicleType.objects.create(name='Самосвал'), mileage=100
+        )
+
+    def test_telemetry_ingest_without_journal(self, journal_available):
+        ingest = TelemetryIngest().run([
+            {'vehicle': self.vehicle.pk, 'recorded_at': '2025-01-02T10:00:00Z', 'mileage': '180'},
+            {'vehicle': self.vehicle.pk, 'recorded_at': '2025-01-01T10:00:00Z', 'mileage': '170'},
+        ])
+        self.assertEqual(ingest.created, 2)
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.mileage, Decimal('180'))
+
+    def test_downtime_reports_without_journal(self, journal_available):
+        period = {'start': '2025-01-01', 'end': '2025-01-11'}
+        for url in [reverse('vehicle:api_vehicle_history', args=[self.vehicle.pk]),
+                    reverse('vehicle:api_fleet_downtime')]:
+            response = self.client.get(url, period)
+            self.assertEqual(response.status_code, 501)
+            self.assertIn('PostgreSQL', response.json()['errors'][0])
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        self.vehicle_type = VehicleType.objects.create(name='Самосвал')
+
+    def create_vehicles(self, count):
+        Vehicle.objects.bulk_create([
+            Vehicle(reg_number=f'A{i:03d}', brand='КАМАЗ', date_purchase=date(2024, 1, 1),
+                    type=self.vehicle_type, mileage=i)
+            for i in range(count)
+        ])
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:vehicle_{model}_changelist')
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(context.captured_queries)
+
+    def test_changelist_query_count_is_constant(self):
+        self.create_vehicles(3)
+        VehicleImage.objects.create(vehicle=Vehicle.objects.first(), file='vehicle_images/a.jpg')
+        vehicle_queries = self.changelist_queries('vehicle')
+        image_queries = self.changelist_queries('vehicleimage')
+        self.create_vehicles(30)
+        VehicleImage.objects.bulk_create([
+            VehicleImage(vehicle=vehicle, file='vehicle_images/a.jpg') for vehicle in Vehicle.objects.all()
+        ])
+        self.assertEqual(self.changelist_queries('vehicle'), vehicle_queries)
+        self.assertEqual(self.changelist_queries('vehicleimage'), image_queries)
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Оценка числа строк берётся из EXPLAIN PostgreSQL')
+    @override_settings(VEHICLE_ADMIN_EXACT_COUNT_LIMIT=5)
+    def test_count_is_estimated_above_limit(self):
+        self.create_vehicles(20)
+        with CaptureQueriesContext(connection) as context:
+            count = EstimatedCountPaginator(Vehicle.objects.order_by('-id'), 10).count
+        self.assertGreaterEqual(count, 6)
+        self.assertTrue(any(query['sql'].startswith('EXPLAIN') for query in context.captured_queries))
+        self.assertEqual(EstimatedCountPaginator(Vehicle.objects.filter(mileage__lt=3).order_by('-id'), 10).count, 3)
+
+    def test_bulk_soft_delete_and_restore(self):
+        self.create_vehicles(3)
+        vehicles = list(Vehicle.objects.order_by('id'))
+        VehicleImage.objects.create(vehicle=vehicles[0], file='vehicle_images/a.jpg')
+        url = reverse('admin:vehicle_vehicle_changelist')
+        selected = [vehicles[0].pk, vehicles[1].pk]
+        generation = cache.get('vehicle:page-generation')
+
+        self.client.post(url, {'action': 'soft_delete_selected', '_selected_action': selected})
+        self.assertEqual(list(Vehicle.alive.values_list('pk', flat=True)), [vehicles[2].pk])
+        self.assertFalse(VehicleImage.alive.exists())
+        self.assertNotEqual(cache.get('vehicle:page-generation'), generation)
+
+        self.client.post(url, {'action': 'restore_selected', '_selected_action': selected})
+        self.assertEqual(Vehicle.alive.count(), 3)
+
+    def test_spare_part_type_soft_delete_cascades(self):
+        part_type = SparePartType.objects.create(name='Фильтр')
+        SparePart.objects.create(type=part_type)
+        url = reverse('admin:vehicle_spareparttype_changelist')
+        self.client.post(url, {'action': 'soft_delete_selected', '_selected_action': [part_type.pk]})
+        self.assertFalse(SparePartType.alive.exists())
+        self.assertFalse(SparePart.alive.exists())
+
+    def test_vehicle_type_restore_invalidates_choices(self):
+        VehicleType.objects.filter(pk=self.vehicle_type.pk).update(is_deleted=True)
+        url = reverse('admin:vehicle_vehicletype_changelist')
+        self.client.post(url, {'action': 'restore_selected', '_selected_action': [self.vehicle_type.pk]})
+        self.assertIn(self.vehicle_type.pk, [pk for pk, _ in VehicleForm().fields['type'].choices])
@@ -0,0 +1,49 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from sorl.thumbnail import get_thumbnail
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def pregenerate(file_name):
+    """
+    Создаёт миниатюры всех размеров из VEHICLE_THUMBNAIL_SIZES, которые
+    используют шаблоны, чтобы первый просмотр карточки не ресайзил фото в запросе.
+    """
+    for geometry, options in settings.VEHICLE_THUMBNAIL_SIZES:
+        get_thumbnail(file_name, geometry, **options)
+
+
+def pregenerate_many(file_names):
+    try:
+        for file_name in file_names:
+            try:
+                pregenerate(file_name)
+            except Exception:
+                logger.exception('Не удалось создать миниатюры для %s', file_name)
+    finally:
+        # Хранилище ключей sorl пишет в БД из рабочего потока или процесса
+        connections.close_all()
+    return len(file_names)
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.VEHICLE_THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+    return _executor
+
+
+def submit(file_names):
+    return get_executor().submit(pregenerate_many, list(file_names))
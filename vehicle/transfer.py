@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+
+from . import page_cache
+from .forms import VehicleImportForm
+from .models import Vehicle, VehicleType
+
+FORMATS = ('csv', 'jsonl')
+EXPORT_FIELDS = [
+    'id', 'reg_number', 'brand', 'date_purchase', 'type', 'mileage', 'operation_status',
+]
+
+
+def detect_format(filename, default='csv'):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return extension if extension in FORMATS else default
+
+
+def iter_rows(stream, fmt):
+    """Построчно читает текстовый поток CSV/JSONL, не загружая файл в память."""
+    if fmt == 'csv':
+        try:
+            yield from csv.DictReader(stream)
+        except csv.Error as exc:
+            raise ValueError(f'Некорректный CSV: {exc}')
+        return
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            raise ValueError(f'Строка {number}: некорректный JSON')
+        if not isinstance(row, dict):
+            raise ValueError(f'Строка {number}: ожидается JSON-объект')
+        yield row
+
+
+class VehicleImporter:
+    """
+    Проверяет строки по правилам VehicleForm и вставляет их через bulk_create
+    пачками по batch_size. Типы техники ищутся по названию в словаре,
+    который загружается одним запросом.
+    """
+
+    def __init__(self, batch_size=None, create_types=False, max_errors=100):
+        self.batch_size = batch_size or settings.VEHICLE_IMPORT_BATCH_SIZE
+        self.create_types = create_types
+        self.max_errors = max_errors
+        self.created = 0
+        self.errors = []
+        self._types = None
+
+    def resolve_type(self, value, create=False):
+        if self._types is None:
+            self._types = dict(VehicleType.alive.values_list('name', 'id'))
+        # В JSONL тип может прийти числом или другим значением, а не строкой
+        name = '' if value is None else str(value).strip()
+        if name not in self._types and name and create:
+            self._types[name] = VehicleType.objects.create(name=name).pk
+        return self._types.get(name)
+
+    def run(self, rows):
+        batch = []
+        for line, row in enumerate(rows, start=1):
+            vehicle = self.build(line, row)
+            if vehicle is None:
+                continue
+            batch.append(vehicle)
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        self.flush(batch)
+        return self
+
+    def build(self, line, row):
+        form = VehicleImportForm(data=row)
+        errors = dict(form.errors) if not form.is_valid() else {}
+        # Новый тип создаётся только для строки, прошедшей проверку
+        type_id = self.resolve_type(row.get('type'), create=self.create_types and not errors)
+        if type_id is None:
+            errors['type'] = [f'Неизвестный тип техники: {row.get("type")!r}']
+        if errors:
+            if len(self.errors) < self.max_errors:
+                self.errors.append({'line': line, 'errors': errors})
+            return None
+        vehicle = form.save(commit=False)
+        vehicle.type_id = type_id
+        return vehicle
+
+    def flush(self, batch):
+        if batch:
+            Vehicle.objects.bulk_create(batch)
+            page_cache.invalidate()
+            self.created += len(batch)
+
+    def report(self):
+        return {'created': self.created, 'errors': self.errors}
+
+
+def iter_export(fmt, queryset=None, chunk_size=2000):
+    """Отдаёт выгрузку кусками текста; строки читаются через iterator()."""
+    if queryset is None:
+        queryset = Vehicle.alive.order_by('id')
+    rows = queryset.values_list(
+        'id', 'reg_number', 'brand', 'date_purchase', 'type__name', 'mileage', 'operation_status'
+    ).iterator(chunk_size=chunk_size)
+
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            writer.writerow(row)
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        for row in rows:
+            item = dict(zip(EXPORT_FIELDS, row))
+            item['date_purchase'] = item['date_purchase'].isoformat()
+            item['mileage'] = str(item['mileage'])
+            yield json.dumps(item, ensure_ascii=False) + '\n'
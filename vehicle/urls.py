@@ -1,16 +1,49 @@
+from django.conf import settings
 from django.urls import path
 
-from vehicle import views
+from vehicle import api, views
+
+if settings.VEHICLE_ASYNC_VIEWS:
+    vehicle_list, vehicle_detail, vehicletype_list = (
+        views.AsyncVehicleListView, views.AsyncVehicleDetailView, views.AsyncVehicleTypeListView
+    )
+else:
+    vehicle_list, vehicle_detail, vehicletype_list = (
+        views.VehicleListView, views.VehicleDetailView, views.VehicleTypeListView
+    )
 
 app_name = 'vehicle'
 urlpatterns = [
-    path('vehicles/', views.VehicleListView.as_view(), name='vehicle_list'),
+    path('vehicles/', vehicle_list.as_view(), name='vehicle_list'),
+    path('vehicles/import/', views.VehicleImportView.as_view(), name='vehicle_import'),
+    path('vehicles/export/', views.VehicleExportView.as_view(), name='vehicle_export'),
     path('vehicles/create/', views.VehicleCreateView.as_view(), name='vehicle_create'),
-    path('vehicles/<int:pk>/', views.VehicleDetailView.as_view(), name='vehicle_detail'),
+    path('vehicles/<int:pk>/', vehicle_detail.as_view(), name='vehicle_detail'),
     path('vehicles/<int:pk>/edit/', views.VehicleUpdateView.as_view(), name='vehicle_update'),
     path('vehicles/<int:pk>/delete/', views.VehicleDeleteView.as_view(), name='vehicle_delete'),
-    path('vehicle-types/', views.VehicleTypeListView.as_view(), name='vehicletype_list'),
+    path('vehicle-types/', vehicletype_list.as_view(), name='vehicletype_list'),
     path('vehicle-types/create/', views.VehicleTypeCreateView.as_view(), name='vehicletype_create'),
     path('vehicle-types/<int:pk>/', views.VehicleTypeUpdateView.as_view(), name='vehicletype_update'),
     path('vehicle-types/<int:pk>/delete/', views.VehicleTypeDeleteView.as_view(), name='vehicletype_delete'),
+    path('spare-parts/', views.SparePartListView.as_view(), name='sparepart_list'),
+    path('spare-parts/create/', views.SparePartCreateView.as_view(), name='sparepart_create'),
+    path('spare-parts/<int:pk>/', views.SparePartDetailView.as_view(), name='sparepart_detail'),
+    path('spare-parts/<int:pk>/edit/', views.SparePartUpdateView.as_view(), name='sparepart_update'),
+    path('spare-parts/<int:pk>/delete/', views.SparePartDeleteView.as_view(), name='sparepart_delete'),
+    path('spare-part-types/', views.SparePartTypeListView.as_view(), name='spareparttype_list'),
+    path('spare-part-types/create/', views.SparePartTypeCreateView.as_view(), name='spareparttype_create'),
+    path('spare-part-types/<int:pk>/', views.SparePartTypeUpdateView.as_view(), name='spareparttype_update'),
+    path('spare-part-types/<int:pk>/delete/', views.SparePartTypeDeleteView.as_view(), name='spareparttype_delete'),
+    path('attributes/', views.AttributeListView.as_view(), name='attribute_list'),
+    path('attributes/create/', views.AttributeCreateView.as_view(), name='attribute_create'),
+    path('attributes/<int:pk>/', views.AttributeUpdateView.as_view(), name='attribute_update'),
+    path('attributes/<int:pk>/delete/', views.AttributeDeleteView.as_view(), name='attribute_delete'),
+    path('api/vehicles/', api.VehicleApiListView.as_view(), name='api_vehicle_list'),
+    path('api/vehicles/<int:pk>/', api.VehicleApiDetailView.as_view(), name='api_vehicle_detail'),
+    path('api/vehicle-types/', api.VehicleTypeApiListView.as_view(), name='api_vehicletype_list'),
+    path('api/fleet-status/', api.FleetStatusApiView.as_view(), name='api_fleet_status'),
+    path('api/images/', api.VehicleImageApiListView.as_view(), name='api_vehicleimage_list'),
+    path('api/vehicles/<int:pk>/history/', api.VehicleHistoryApiView.as_view(), name='api_vehicle_history'),
+    path('api/downtime/', api.FleetDowntimeApiView.as_view(), name='api_fleet_downtime'),
+    path('api/telemetry/', api.TelemetryApiView.as_view(), name='api_telemetry'),
 ]
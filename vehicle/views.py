@@ -1,12 +1,27 @@
-from django.db import transaction
-from django.forms import inlineformset_factory
+import asyncio
+import io
+import weakref
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, get_object_or_404
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, UpdateView, DetailView, ListView, View
 
-from .forms import VehicleForm, VehicleImageForm, VehicleFilterForm
+from .forms import VehicleForm, VehicleFilterForm, VehicleImportUploadForm
+from .forms import VehicleImageFormSet, VehicleImageUploadForm
 from .forms import VehicleTypeForm
-from .models import Vehicle, VehicleImage, VehicleType
+from .forms import AttributeForm, SparePartFilterForm, SparePartForm, SparePartTypeForm
+from .models import Attribute, SparePart, SparePartType, Vehicle, VehicleImage, VehicleType
+from .page_cache import AsyncPageCacheMixin, PageCacheMixin
+from .pagination import AsyncPaginationMixin, CursorPaginationMixin
+from .search import SearchMode, search_vehicles
+from .services import save_spare_part, save_vehicle, soft_delete_vehicle, soft_delete_vehicle_type
+from .services import soft_delete_attribute, soft_delete_spare_part, soft_delete_spare_part_type
+from .transfer import FORMATS, VehicleImporter, detect_format, iter_export, iter_rows
 
 
 class VehicleCreateView(CreateView):
@@ -17,35 +32,17 @@ class VehicleCreateView(CreateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        ImageFormSet = inlineformset_factory(
-            Vehicle, VehicleImage,
-            form=VehicleImageForm,
-            extra=3,
-            can_delete=False
-        )
-        if self.request.method == 'POST':
-            context['image_formset'] = ImageFormSet(self.request.POST, self.request.FILES)
-        else:
-            context['image_formset'] = ImageFormSet()
+        context.setdefault('upload_form', VehicleImageUploadForm())
         return context
 
     def form_valid(self, form):
-        context = self.get_context_data()
-        image_formset = context['image_formset']
-
-        if image_formset.is_valid():
-            self.object = form.save()
-            image_formset.instance = self.object
-
-            images = image_formset.save(commit=False)
-
-            for image in images:
-                if image.file:
-                    image.save()
+        upload_form = VehicleImageUploadForm(self.request.POST, self.request.FILES)
 
+        if upload_form.is_valid():
+            self.object = save_vehicle(form, upload_form.cleaned_data['images'])
             return redirect(self.success_url)
         else:
-            return self.form_invalid(form)
+            return self.render_to_response(self.get_context_data(form=form, upload_form=upload_form))
 
 
 class VehicleUpdateView(UpdateView):
@@ -54,91 +51,181 @@ class VehicleUpdateView(UpdateView):
     template_name = 'vehicle/vehicle_form.html'
     success_url = reverse_lazy('vehicle:vehicle_list')
 
+    def get_image_formset(self):
+        if not hasattr(self, '_image_formset'):
+            queryset = VehicleImage.alive.filter(vehicle=self.object).order_by('id')
+            if self.request.method == 'POST':
+                self._image_formset = VehicleImageFormSet(
+                    self.request.POST,
+                    self.request.FILES,
+                    instance=self.object,
+                    queryset=queryset
+                )
+            else:
+                self._image_formset = VehicleImageFormSet(instance=self.object, queryset=queryset)
+        return self._image_formset
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        ImageFormSet = inlineformset_factory(
-            Vehicle, VehicleImage,
-            form=VehicleImageForm,
-            extra=3,
-            can_delete=True
-        )
-        if self.request.method == 'POST':
-            context['image_formset'] = ImageFormSet(
-                self.request.POST,
-                self.request.FILES,
-                instance=self.object
-            )
-        else:
-            context['image_formset'] = ImageFormSet(
-                instance=self.object,
-                queryset=VehicleImage.objects.filter(vehicle=self.object, is_deleted=False)
-            )
+        context['image_formset'] = self.get_image_formset()
+        context.setdefault('upload_form', VehicleImageUploadForm())
         return context
 
     def form_valid(self, form):
-        context = self.get_context_data()
-        image_formset = context['image_formset']
-
-        if image_formset.is_valid():
-            self.object = form.save()
-
-            for image_form in image_formset:
-                image = image_form.instance
-
-                if image_form.cleaned_data.get('DELETE'):
-                    if image.pk:
-                        image.is_deleted = True
-                        image.save()
-
-                elif not image.pk and image_form.cleaned_data.get('file'):
-                    image.vehicle = self.object
-                    image.save()
-
+        image_formset = self.get_image_formset()
+        upload_form = VehicleImageUploadForm(self.request.POST, self.request.FILES)
+
+        if image_formset.is_valid() and upload_form.is_valid():
+            delete_ids = [
+                image_form.instance.pk
+                for image_form in image_formset
+                if image_form.instance.pk and image_form.cleaned_data.get('DELETE')
+            ]
+            self.object = save_vehicle(form, upload_form.cleaned_data['images'], delete_ids)
             return redirect(self.get_success_url())
         else:
-            return self.form_invalid(form)
+            return self.render_to_response(self.get_context_data(form=form, upload_form=upload_form))
 
 
 class VehicleDetailView(DetailView):
     model = Vehicle
     template_name = 'vehicle/vehicle_detail.html'
     context_object_name = 'vehicle'
+    queryset = Vehicle.objects.with_detail_data()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['images'] = self.object.images.filter(is_deleted=False)
+        context['images'] = self.object.alive_images
+        context['fragment_cache_timeout'] = settings.VEHICLE_FRAGMENT_CACHE_TIMEOUT
         return context
 
 
-class VehicleListView(ListView):
+class VehicleListView(PageCacheMixin, CursorPaginationMixin, ListView):
     model = Vehicle
     template_name = 'vehicle/vehicle_list.html'
     context_object_name = 'vehicles'
     paginate_by = 10
 
     def get_queryset(self):
-        qs = Vehicle.objects.filter(is_deleted=False)
-        brand = self.request.GET.get('brand')
-        if brand:
-            qs = qs.filter(brand__icontains=brand)
+        qs = Vehicle.alive.with_list_data().order_by('created_at', 'id')
+        self.filter_form = VehicleFilterForm(self.request.GET or None)
+        if self.filter_form.is_valid():
+            qs = search_vehicles(
+                qs,
+                self.filter_form.cleaned_data['brand'],
+                self.filter_form.cleaned_data['search'] or SearchMode.BRAND
+            )
         return qs
 
+    def get_pagination_mode(self):
+        # Похожие упорядочены по сходству, а курсор держится на порядке (created_at, id)
+        # и сбросил бы ранжирование, поэтому такой поиск листается по номерам страниц
+        if self.filter_form.is_valid() and self.filter_form.is_ranked():
+            return 'offset'
+        return super().get_pagination_mode()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['filter_form'] = VehicleFilterForm(self.request.GET or None)
+        context['filter_form'] = self.filter_form
+        context['filter_query'] = urlencode({
+            key: value for key, value in self.request.GET.items() if key in ('brand', 'search') and value
+        })
         return context
 
 
+_db_slots = weakref.WeakKeyDictionary()
+
+
+def db_slot():
+    """
+    Семафор на event loop: каждый async-запрос работает с БД в своём потоке и своём
+    соединении, поэтому без ограничения сотни клиентов упираются в max_connections.
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in _db_slots:
+        _db_slots[loop] = asyncio.Semaphore(settings.VEHICLE_ASYNC_DB_CONCURRENCY)
+    return _db_slots[loop]
+
+
+@sync_to_async
+def release_connection():
+    # Соединение потока запроса закрывается по правилам CONN_MAX_AGE сразу после выборки,
+    # а не после рендеринга и отправки ответа; внутри транзакции (тесты) не трогаем
+    if not connection.in_atomic_block:
+        connection.close_if_unusable_or_obsolete()
+
+
+class AsyncListMixin(AsyncPaginationMixin):
+    async def get(self, request, *args, **kwargs):
+        async with db_slot():
+            try:
+                # get_queryset может один раз обратиться к БД (проверка pg_trgm в поиске)
+                self.object_list = await sync_to_async(self.get_queryset)()
+                page_size = self.get_paginate_by(self.object_list)
+                if page_size:
+                    self._async_page = await self.apaginate_queryset(self.object_list, page_size)
+            finally:
+                await release_connection()
+        # TemplateResponse рендерится обработчиком через sync_to_async, поэтому
+        # {% thumbnail %} и разрешение URL медиа не блокируют event loop
+        return self.render_to_response(self.get_context_data())
+
+
+class AsyncVehicleListView(AsyncPageCacheMixin, AsyncListMixin, VehicleListView):
+    pass
+
+
+class AsyncVehicleDetailView(VehicleDetailView):
+    async def get(self, request, *args, **kwargs):
+        async with db_slot():
+            try:
+                self.object = await Vehicle.objects.with_list_data().aget(pk=self.kwargs[self.pk_url_kwarg])
+                # Асинхронный аналог Prefetch из with_detail_data
+                self.object.alive_images = [
+                    image
+                    async for image in VehicleImage.alive.filter(vehicle_id=self.object.pk).order_by('id').aiterator()
+                ]
+            except Vehicle.DoesNotExist:
+                raise Http404('Техника не найдена')
+            finally:
+                await release_connection()
+        return self.render_to_response(self.get_context_data(object=self.object))
+
+
 class VehicleDeleteView(View):
     def post(self, request, pk):
-        with transaction.atomic():
-            vehicle = get_object_or_404(Vehicle, pk=pk)
-            vehicle.is_deleted = True
-            vehicle.save()
-            VehicleImage.objects.filter(vehicle=vehicle).update(is_deleted=True)
+        vehicle = get_object_or_404(Vehicle, pk=pk)
+        soft_delete_vehicle(vehicle)
         return redirect('vehicle:vehicle_list')
 
 
+class VehicleImportView(View):
+    def post(self, request):
+        form = VehicleImportUploadForm(request.POST, request.FILES)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        upload = form.cleaned_data['file']
+        fmt = form.cleaned_data['format'] or detect_format(upload.name)
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        importer = VehicleImporter(create_types=form.cleaned_data['create_types'])
+        try:
+            importer.run(iter_rows(stream, fmt))
+        except (ValueError, UnicodeDecodeError) as exc:
+            return JsonResponse({'created': importer.created, 'errors': [str(exc)]}, status=400)
+        return JsonResponse(importer.report())
+
+
+class VehicleExportView(View):
+    def get(self, request):
+        fmt = request.GET.get('format')
+        if fmt not in FORMATS:
+            fmt = 'csv'
+        content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(iter_export(fmt), content_type=f'{content_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="vehicles.{fmt}"'
+        return response
+
+
 class VehicleTypeCreateView(CreateView):
     model = VehicleType
     form_class = VehicleTypeForm
@@ -164,25 +251,142 @@ class VehicleTypeUpdateView(UpdateView):
         return context
 
 
-class VehicleTypeListView(ListView):
+class VehicleTypeListView(PageCacheMixin, CursorPaginationMixin, ListView):
     model = VehicleType
     template_name = 'vehicle/vehicletype_list.html'
     context_object_name = 'types'
     paginate_by = 10
 
     def get_queryset(self):
-        return VehicleType.objects.filter(is_deleted=False)
+        return VehicleType.alive.order_by('created_at', 'id')
+
+
+class AsyncVehicleTypeListView(AsyncPageCacheMixin, AsyncListMixin, VehicleTypeListView):
+    pass
 
 
 class VehicleTypeDeleteView(View):
     def post(self, request, pk):
-        with transaction.atomic():
-            vehicle_type = get_object_or_404(VehicleType, pk=pk)
-            vehicle_type.is_deleted = True
-            vehicle_type.save()
+        vehicle_type = get_object_or_404(VehicleType, pk=pk)
+        soft_delete_vehicle_type(vehicle_type)
+        return redirect('vehicle:vehicletype_list')
 
-            vehicles = Vehicle.objects.filter(type=vehicle_type)
-            vehicles.update(is_deleted=True)
 
-            VehicleImage.objects.filter(vehicle__in=vehicles).update(is_deleted=True)
-        return redirect('vehicle:vehicletype_list')
+class SparePartListView(CursorPaginationMixin, ListView):
+    model = SparePart
+    template_name = 'vehicle/sparepart_list.html'
+    context_object_name = 'parts'
+    paginate_by = 10
+
+    def get_queryset(self):
+        qs = SparePart.alive.with_list_data().order_by('created_at', 'id')
+        self.filter_form = SparePartFilterForm(self.request.GET or None)
+        if self.filter_form.is_valid():
+            qs = self.filter_form.filter(qs)
+        return qs
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['filter_form'] = self.filter_form
+        context['filter_query'] = urlencode({
+            key: value for key, value in self.request.GET.items()
+            if key in self.filter_form.fields and value
+        })
+        return context
+
+
+class SparePartDetailView(DetailView):
+    model = SparePart
+    template_name = 'vehicle/sparepart_detail.html'
+    context_object_name = 'part'
+    queryset = SparePart.alive.with_list_data()
+
+
+class SparePartFormMixin:
+    model = SparePart
+    form_class = SparePartForm
+    template_name = 'vehicle/sparepart_form.html'
+    success_url = reverse_lazy('vehicle:sparepart_list')
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['attributes'] = Attribute.alive.order_by('name', 'id')
+        return kwargs
+
+    def form_valid(self, form):
+        self.object = save_spare_part(form)
+        return redirect(self.get_success_url())
+
+
+class SparePartCreateView(SparePartFormMixin, CreateView):
+    pass
+
+
+class SparePartUpdateView(SparePartFormMixin, UpdateView):
+    queryset = SparePart.alive.with_list_data()
+
+
+class SparePartDeleteView(View):
+    def post(self, request, pk):
+        soft_delete_spare_part(get_object_or_404(SparePart, pk=pk))
+        return redirect('vehicle:sparepart_list')
+
+
+class SparePartTypeCreateView(CreateView):
+    model = SparePartType
+    form_class = SparePartTypeForm
+    template_name = 'vehicle/spareparttype_form.html'
+    success_url = reverse_lazy('vehicle:spareparttype_list')
+
+
+class SparePartTypeUpdateView(UpdateView):
+    model = SparePartType
+    form_class = SparePartTypeForm
+    template_name = 'vehicle/spareparttype_form.html'
+    success_url = reverse_lazy('vehicle:spareparttype_list')
+
+
+class SparePartTypeListView(CursorPaginationMixin, ListView):
+    model = SparePartType
+    template_name = 'vehicle/spareparttype_list.html'
+    context_object_name = 'types'
+    paginate_by = 10
+
+    def get_queryset(self):
+        return SparePartType.alive.order_by('created_at', 'id')
+
+
+class SparePartTypeDeleteView(View):
+    def post(self, request, pk):
+        soft_delete_spare_part_type(get_object_or_404(SparePartType, pk=pk))
+        return redirect('vehicle:spareparttype_list')
+
+
+class AttributeCreateView(CreateView):
+    model = Attribute
+    form_class = AttributeForm
+    template_name = 'vehicle/attribute_form.html'
+    success_url = reverse_lazy('vehicle:attribute_list')
+
+
+class AttributeUpdateView(UpdateView):
+    model = Attribute
+    form_class = AttributeForm
+    template_name = 'vehicle/attribute_form.html'
+    success_url = reverse_lazy('vehicle:attribute_list')
+
+
+class AttributeListView(CursorPaginationMixin, ListView):
+    model = Attribute
+    template_name = 'vehicle/attribute_list.html'
+    context_object_name = 'attributes'
+    paginate_by = 10
+
+    def get_queryset(self):
+        return Attribute.alive.order_by('created_at', 'id')
+
+
+class AttributeDeleteView(View):
+    def post(self, request, pk):
+        soft_delete_attribute(get_object_or_404(Attribute, pk=pk))
+        return redirect('vehicle:attribute_list')